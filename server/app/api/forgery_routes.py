@@ -1,13 +1,16 @@
 from fastapi import APIRouter, HTTPException
-from app.services.image_manipulation_service import ImageManipulationService
-from app.services.face_manipulation_service import FaceManipulationService
-from app.services.audio_deepfake_service import AudioDeepfakeService
-from app.services.gan_detection_service import GANDetectionService
-from app.utils.file_utils import download_file, remove_temp_file, get_file_content
+from fastapi.concurrency import run_in_threadpool
+from app.utils.file_utils import download_media, remove_temp_file, fetch_file_content, MediaHandle, FileTooLargeError
 from app.utils.forgery_image_utils import detect_face
-from app.utils.forgery_video_utils import extract_audio, extract_frames, compress_and_process_video, detect_speech # Adjust the import path if necessary
-from app.services.deepfake_video_detection import DeepfakeVideoDetectionService
+from app.utils.forgery_video_utils import extract_audio, extract_frames, prepare_video_for_analysis, detect_speech # Adjust the import path if necessary
+from app.core.result_cache import result_cache
+from app.core.model_registry import model_registry
+from app.core.config import (
+    CASCADE_POLICY, CASCADE_STAGES, CASCADE_FAKE_THRESHOLD, CASCADE_REAL_THRESHOLD, CASCADE_MIN_STAGES,
+    FRAME_SAMPLING_MODE, FRAME_SAMPLE_BUDGET, VIDEO_TRANSCODE_POLICY
+)
 import os
+import asyncio
 import numpy as np
 import logging
 import traceback
@@ -18,13 +21,31 @@ router = APIRouter()
 class DetectForgeryRequest(BaseModel):
     file_url: str
 
-# Initialize services
-image_manipulation_service = ImageManipulationService()
-face_manipulation_service = FaceManipulationService()
-audio_deepfake_service = AudioDeepfakeService()
-gan_detection_service = GANDetectionService()
-deepfake_video_detection_service = DeepfakeVideoDetectionService()
 
+# Image cascade stages: (model registry name, service method)
+CASCADE_STAGE_SERVICES = {
+    "image_manipulation": ("image_manipulation", "detect_manipulation"),
+    "gan_detection": ("gan_detection", "detect_gan"),
+    "face_manipulation": ("face_manipulation", "detect_manipulation"),
+}
+CASCADE_POLICIES = ("full", "exit_on_fake", "exit_on_decisive")
+
+# Results reported for stages the cascade did not run, shaped like real results
+SKIPPED_STAGE_RESULTS = {
+    "image_manipulation": {"class": None, "confidence": "0.00%", "is_manipulated": False},
+    "gan_detection": {"is_gan": False, "real_confidence": 0.0, "fake_confidence": 0.0},
+    "face_manipulation": {"is_deepfake": False, "confidence": 0.0, "predicted_label": None},
+}
+
+if CASCADE_POLICY not in CASCADE_POLICIES:
+    raise ValueError(f"Unknown CASCADE_POLICY '{CASCADE_POLICY}'. Expected one of: {', '.join(CASCADE_POLICIES)}")
+for _stage in CASCADE_STAGES:
+    if _stage not in CASCADE_STAGE_SERVICES:
+        raise ValueError(f"Unknown cascade stage '{_stage}'. Expected one of: {', '.join(CASCADE_STAGE_SERVICES)}")
+
+def video_analysis_signature() -> str:
+    """Settings that change video results, for the result cache key."""
+    return f"{FRAME_SAMPLING_MODE}:{FRAME_SAMPLE_BUDGET}:{VIDEO_TRANSCODE_POLICY}"
 
 def parse_confidence(value):
     if isinstance(value, str):
@@ -46,19 +67,42 @@ async def detect_forgery(request: DetectForgeryRequest):
         file_extension = get_file_extension(file_url)
         logging.info(f"Detected file extension: {file_extension}")
         
-        firebase_filename = await download_file(file_url)
-        logging.info(f"File downloaded and saved as: {firebase_filename}")
-        
         if file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'gif', 'tiff', 'webp']:
-            logging.info(f"Processing image file: {firebase_filename}")
-            return await process_image(firebase_filename)
+            media_kind = "image"
         elif file_extension in ['mp4', 'avi', 'mov', 'flv', 'wmv']:
-            logging.info(f"Processing video file: {firebase_filename}")
-            return await process_video(firebase_filename)
+            media_kind = "video"
         else:
             logging.error(f"Unsupported file type: {file_extension} (URL: {file_url})")
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+
+        media = await download_media(file_url)
+        firebase_filename = media.filename
+        logging.info(f"File downloaded and saved as: {firebase_filename}")
+
+        namespace = f"detect_forgery:{media_kind}"
+        if media_kind == "image":
+            namespace += f":{cascade_signature()}"
+        else:
+            namespace += f":{video_analysis_signature()}"
+        cache_key = result_cache.make_key(namespace, media.digest)
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Returning cached forgery result for: {firebase_filename}")
+            return cached_result
+
+        if media_kind == "image":
+            logging.info(f"Processing image file: {firebase_filename}")
+            results = await process_image(media)
+        else:
+            logging.info(f"Processing video file: {firebase_filename}")
+            results = await process_video(media)
+
+        result_cache.set(cache_key, results)
+        return results
     
+    except FileTooLargeError as e:
+        logging.error(f"Rejected oversized file: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error processing file: {e}")
         logging.error(traceback.format_exc())
@@ -69,27 +113,99 @@ async def detect_forgery(request: DetectForgeryRequest):
             logging.info(f"Removing temporary file: {firebase_filename}")
             await remove_temp_file(firebase_filename)
 
-async def process_image(firebase_filename: str):
-    logging.info(f"Starting image processing for: {firebase_filename}")
-    image_content = get_file_content(firebase_filename)
-    has_face = detect_face(image_content)
-    logging.info(f"Face detection result for {firebase_filename}: {'Face detected' if has_face else 'No face detected'}")
-    results = {
-        "image_manipulation": image_manipulation_service.detect_manipulation(firebase_filename),
-        "gan_detection": gan_detection_service.detect_gan(firebase_filename)
-    }
-    logging.info(f"Image manipulation detection result: {results['image_manipulation']}")
-    logging.info(f"GAN detection result: {results['gan_detection']}")
-    if has_face:
-        results["face_manipulation"] = face_manipulation_service.detect_manipulation(firebase_filename)
-        logging.info(f"Face manipulation detection result: {results['face_manipulation']}")
+def cascade_signature() -> str:
+    return f"{CASCADE_POLICY}:{','.join(CASCADE_STAGES)}:{CASCADE_FAKE_THRESHOLD}:{CASCADE_REAL_THRESHOLD}:{CASCADE_MIN_STAGES}"
+
+async def run_image_stage(stage: str, media: MediaHandle):
+    model_name, method = CASCADE_STAGE_SERVICES[stage]
+    service = await model_registry.get_async(model_name)
+    # Model calls run on the threadpool so concurrent requests can share
+    # batched forward passes without blocking the event loop.
+    return await run_in_threadpool(getattr(service, method), media)
+
+def stage_verdict(stage: str, result: dict):
+    """'fake' or 'real' when a stage result clears the cascade thresholds, otherwise None."""
+    if stage == "image_manipulation":
+        confidence = parse_confidence(result.get("confidence", "0%"))
+        is_fake = result.get("is_manipulated", False)
+        # Class 0 is the manipulated class; a confident prediction of any other class counts as real
+        is_real = not is_fake and result.get("class") != model_registry.get("image_manipulation").class_names[0]
+    elif stage == "gan_detection":
+        is_fake = result.get("is_gan", False)
+        is_real = not is_fake
+        confidence = (result.get("fake_confidence", 0.0) if is_fake else result.get("real_confidence", 0.0)) / 100
     else:
-        results["face_manipulation"] = {
-            "is_manipulated": False,
-            "confidence": "0%"
-        }
-        logging.info("Face manipulation detection skipped (no face detected)")
-    logging.info(f"Image processing completed for: {firebase_filename}")
+        is_fake = result.get("is_deepfake", False)
+        is_real = not is_fake
+        confidence = result.get("confidence", 0.0)
+
+    if is_fake and confidence >= CASCADE_FAKE_THRESHOLD:
+        return "fake"
+    if is_real and confidence >= CASCADE_REAL_THRESHOLD:
+        return "real"
+    return None
+
+async def process_image(media: MediaHandle):
+    logging.info(f"Starting image processing for: {media}")
+    await media.load()
+    face_detection = asyncio.ensure_future(run_in_threadpool(detect_face, media))
+    results = {}
+    stages_run = ["face_detection"]
+    stages_skipped = []
+    exit_reason = None
+
+    if CASCADE_POLICY == "full":
+        stages = [stage for stage in CASCADE_STAGES if stage != "face_manipulation"]
+        outputs = await asyncio.gather(*(run_image_stage(stage, media) for stage in stages))
+        results.update(zip(stages, outputs))
+        stages_run.extend(stages)
+        has_face = await face_detection
+        if has_face and "face_manipulation" in CASCADE_STAGES:
+            results["face_manipulation"] = await run_image_stage("face_manipulation", media)
+            stages_run.append("face_manipulation")
+    else:
+        # Stages run one at a time, cheapest first, so a decisive verdict can
+        # skip everything after it.
+        has_face = await face_detection
+        verdicts = []
+        for stage in CASCADE_STAGES:
+            if stage == "face_manipulation" and not has_face:
+                continue
+            if exit_reason:
+                stages_skipped.append(stage)
+                continue
+            results[stage] = await run_image_stage(stage, media)
+            stages_run.append(stage)
+            verdict = stage_verdict(stage, results[stage])
+            verdicts.append(verdict)
+            if verdict == "fake":
+                exit_reason = f"{stage} flagged the image as fake"
+            elif (CASCADE_POLICY == "exit_on_decisive" and len(verdicts) >= CASCADE_MIN_STAGES
+                  and all(v == "real" for v in verdicts)):
+                exit_reason = f"{len(verdicts)} stages agreed the image is real"
+
+    logging.info(f"Face detection result for {media}: {'Face detected' if has_face else 'No face detected'}")
+    for stage in SKIPPED_STAGE_RESULTS:
+        if stage in results:
+            logging.info(f"{stage} result: {results[stage]}")
+        elif stage == "face_manipulation" and not has_face:
+            results[stage] = {
+                "is_manipulated": False,
+                "confidence": "0%"
+            }
+            logging.info("Face manipulation detection skipped (no face detected)")
+        else:
+            if stage not in stages_skipped:
+                stages_skipped.append(stage)
+            results[stage] = {**SKIPPED_STAGE_RESULTS[stage], "skipped": True}
+
+    results["cascade"] = {
+        "policy": CASCADE_POLICY,
+        "stages_run": stages_run,
+        "stages_skipped": stages_skipped,
+        "exit_reason": exit_reason
+    }
+    logging.info(f"Image processing completed for: {media} (stages run: {', '.join(stages_run)})")
     return results
 
 def convert_to_python_types(obj):
@@ -103,31 +219,33 @@ def convert_to_python_types(obj):
         return obj.tolist()
     return obj
 
-async def process_video(firebase_filename: str):
-    logging.info(f"Starting video processing for: {firebase_filename}")
+async def process_video(media: MediaHandle):
+    logging.info(f"Starting video processing for: {media}")
+    video = None
     try:
-        compressed_video_filename = await compress_and_process_video(firebase_filename)
-        logging.info(f"Video compressed: {compressed_video_filename}")
+        # The original upload, unless the transcode policy calls for a scratch copy
+        video = await prepare_video_for_analysis(media)
         
-        audio_filename = await extract_audio(compressed_video_filename)
+        audio_filename = await extract_audio(video)
         is_audio_deepfake = False
         
         if audio_filename:
             logging.info(f"Audio extracted successfully: {audio_filename}")
-            audio_content = get_file_content(audio_filename)
+            audio_content = await fetch_file_content(audio_filename, scratch=True)
             if detect_speech(audio_content):
                 logging.info("Speech detected in the audio")
                 # Audio deepfake detection logic here if needed
             else:
                 logging.info("No speech detected in the audio")
-            await remove_temp_file(audio_filename)
+            await remove_temp_file(audio_filename, scratch=True)
             logging.info(f"Temporary audio file removed: {audio_filename}")
         else:
             logging.info("No audio detected or extracted from the video")
 
         results = {"is_audio_deepfake": is_audio_deepfake}
 
-        frames = await extract_frames(compressed_video_filename)
+        # Decoded RGB frames, kept in memory for every model below
+        frames = await extract_frames(video)
         logging.info(f"Frames extracted: {len(frames)} frames")
 
         results.update({
@@ -145,21 +263,28 @@ async def process_video(firebase_filename: str):
             }
         })
 
-        face_frames = []
         img_manip_detections = []
         img_manip_confidences = []
         gan_detections = []
         gan_confidences = []
 
-        for frame in frames:
-            frame_content = get_file_content(frame)
-            has_face = detect_face(frame_content)
-            if has_face:
-                face_frames.append(frame)
-            
-            img_manip_result = image_manipulation_service.detect_manipulation(frame)
-            gan_result = gan_detection_service.detect_gan(frame)
-            
+        image_manipulation_service, gan_detection_service = await asyncio.gather(
+            model_registry.get_async("image_manipulation"),
+            model_registry.get_async("gan_detection")
+        )
+
+        def detect_faces(frames):
+            return [detect_face(frame) for frame in frames]
+
+        # Each model sees all frames as one batch
+        frame_faces, img_manip_results, gan_results = await asyncio.gather(
+            run_in_threadpool(detect_faces, frames),
+            run_in_threadpool(image_manipulation_service.detect_manipulation_arrays, frames),
+            run_in_threadpool(gan_detection_service.detect_gan_arrays, frames)
+        )
+        face_frames = [frame for frame, has_face in zip(frames, frame_faces) if has_face]
+
+        for img_manip_result, gan_result in zip(img_manip_results, gan_results):
             img_manip_detections.append(img_manip_result.get("is_manipulated", False))
             img_manip_confidences.append(parse_confidence(img_manip_result.get("confidence", "0%")))
             gan_detections.append(gan_result.get("is_gan", False))
@@ -174,7 +299,8 @@ async def process_video(firebase_filename: str):
 
         # Perform deepfake detection if faces were detected
         if face_frames:
-            deepfake_result = deepfake_video_detection_service.detect_deepfake(face_frames)
+            deepfake_video_detection_service = await model_registry.get_async("deepfake_video")
+            deepfake_result = await run_in_threadpool(deepfake_video_detection_service.detect_deepfake_arrays, face_frames)
             deepfake_result = convert_to_python_types(deepfake_result)
             results["face_manipulation"] = {
                 "collective_detection": bool(deepfake_result["is_deepfake"]),
@@ -182,15 +308,14 @@ async def process_video(firebase_filename: str):
             }
         
         logging.info(f"Aggregated results: {results}")
-
-        await remove_temp_file(compressed_video_filename)
-        for frame in frames:
-            await remove_temp_file(frame)
-        logging.info(f"Temporary files removed")
-        logging.info(f"Video processing completed for: {firebase_filename}")
+        logging.info(f"Video processing completed for: {media}")
         
         return results
     except Exception as e:
         logging.error(f"Error processing video: {e}")
         logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"An error occurred while processing the video: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An error occurred while processing the video: {str(e)}")
+    finally:
+        if video is not None and video.scratch:
+            await remove_temp_file(video.filename, scratch=True)
+            logging.info(f"Temporary files removed")
\ No newline at end of file
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel
-from app.services import video_service, image_service, antispoof_service
-from app.services.antispoof_service import antispoof_service
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from app.services import video_service, image_service
+from app.core.model_registry import model_registry
+from app.core.cpu_budget import cpu_budget_report
 from app.services.hash_comparison_service import compare_hash_with_array
 from app.services.image_service import compare_images
-from typing import List
+from app.services.fingerprint_registry import fingerprint_registry, HASH_KINDS
+from app.utils.file_utils import FileTooLargeError
+from typing import List, Optional
 import logging
 import os
 
@@ -12,6 +17,9 @@ router = APIRouter()
 
 class ContentRequest(BaseModel):
     url: str
+    # Sent as "register"; renamed here because the name shadows BaseModel.register
+    register_fingerprint: bool = Field(default=False, alias="register")
+    content_id: Optional[str] = None
 
 class CompareRequest(BaseModel):
     url1: str
@@ -21,6 +29,20 @@ class CompareHashesRequest(BaseModel):
     hash_to_compare: str
     hash_array: List[str]
     file_type: str
+    max_distance: Optional[int] = Field(default=None, ge=0, le=64)
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+class RegistryEntryRequest(BaseModel):
+    hash: str
+    hash_kind: str
+    content_id: Optional[str] = None
+    source_url: Optional[str] = None
+
+class RegistryQueryRequest(BaseModel):
+    hash: str
+    hash_kind: str
+    max_distance: int = Field(default=10, ge=0, le=64)
+    top_k: Optional[int] = Field(default=10, ge=1)
     
 SUPPORTED_VIDEO_FORMATS = ['mp4', 'avi', 'mov', 'flv', 'wmv']
 SUPPORTED_IMAGE_FORMATS = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'tiff', 'webp']
@@ -41,13 +63,29 @@ async def health_check():
     """
     return Response(content="OK", media_type="text/plain")
 
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: 503 until the model groups in PRELOAD_MODEL_GROUPS
+    have loaded, and for good (with the error) if loading them failed. Also reports per-model load state, startup timings and the
+    CPU thread budget in effect.
+    """
+    status = model_registry.status()
+    status["cpu_budget"] = cpu_budget_report()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @router.post("/fingerprint")
 async def create_fingerprint(request: ContentRequest):
     if not is_supported_video_format(request.url):
         raise HTTPException(status_code=400, detail="Video format not supported")
     try:
         result = await video_service.fingerprint_video(request.url)
-        return {"message": "Fingerprint processing completed", "result": result}
+        response = {"message": "Fingerprint processing completed", "result": result}
+        if request.register_fingerprint:
+            response["registry_ids"] = await run_in_threadpool(fingerprint_registry.register_video_fingerprint, result, request.content_id, request.url)
+        return response
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in fingerprint processing: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in fingerprint processing: {str(e)}")
@@ -59,6 +97,8 @@ async def verify_video_only(request: ContentRequest):
     try:
         result = await video_service.fingerprint_video(request.url)
         return {"message": "Video verification completed", "result": result}
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in video verification: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in video verification: {str(e)}")
@@ -66,8 +106,11 @@ async def verify_video_only(request: ContentRequest):
 @router.post("/verify_liveness")
 async def verify_liveness(request: ContentRequest):
     try:
+        antispoof_service = await model_registry.get_async("antispoof")
         result = await antispoof_service.verify_liveness(request.url)
         return {"message": "Liveness verification completed", "result": result}
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in liveness verification: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in liveness verification: {str(e)}")
@@ -79,6 +122,8 @@ async def compare_videos_route(request: CompareRequest):
     try:
         result = await video_service.compare_videos(request.url1, request.url2)
         return {"message": "Video comparison completed", "result": result}
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in video comparison: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in video comparison: {str(e)}")
@@ -89,7 +134,12 @@ async def verify_image_route(request: ContentRequest):
         raise HTTPException(status_code=400, detail="Image format not supported")
     try:
         result = await image_service.verify_image(request.url)
-        return {"message": "Image verification completed", "result": result}
+        response = {"message": "Image verification completed", "result": result}
+        if request.register_fingerprint:
+            response["registry_ids"] = await run_in_threadpool(fingerprint_registry.register_image_hash, result["image_hash"], request.content_id, request.url)
+        return response
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in image verification: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in image verification: {str(e)}")
@@ -101,6 +151,8 @@ async def compare_images_route(request: CompareRequest):
     try:
         result = await compare_images(request.url1, request.url2)
         return {"message": "Image comparison completed", "result": result}
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error in image comparison: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in image comparison: {str(e)}")
@@ -109,12 +161,44 @@ async def compare_images_route(request: CompareRequest):
 @router.post("/compare_hashes")
 async def compare_hashes_route(request: CompareHashesRequest):
     try:
-        comparison_results = compare_hash_with_array(request.hash_to_compare, request.hash_array, request.file_type)
+        comparison_results = compare_hash_with_array(
+            request.hash_to_compare, request.hash_array, request.file_type,
+            max_distance=request.max_distance, top_k=request.top_k
+        )
         return {
             "message": comparison_results["message"],
             "results": comparison_results["results"],
             "matching_hash": comparison_results["matching_hash"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error in hash comparison: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error in hash comparison: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error in hash comparison: {str(e)}")
+
+@router.post("/registry/register")
+async def registry_register_route(request: RegistryEntryRequest):
+    if request.hash_kind not in HASH_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported hash kind. Supported kinds are: {', '.join(HASH_KINDS)}")
+    try:
+        registry_id = await run_in_threadpool(fingerprint_registry.register, request.hash_kind, request.hash, request.content_id, request.source_url)
+        return {"message": "Fingerprint registered", "id": registry_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error in fingerprint registration: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in fingerprint registration: {str(e)}")
+
+@router.post("/registry/query")
+async def registry_query_route(request: RegistryQueryRequest):
+    if request.hash_kind not in HASH_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported hash kind. Supported kinds are: {', '.join(HASH_KINDS)}")
+    try:
+        matches = await run_in_threadpool(fingerprint_registry.query, request.hash_kind, request.hash, request.max_distance, request.top_k)
+        message = "Registry query completed. A matching fingerprint was found." if matches else "Registry query completed. No sufficiently similar fingerprint was found."
+        return {"message": message, "results": matches}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error in registry query: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in registry query: {str(e)}")
@@ -1,5 +1,9 @@
 import os
+import tempfile
 from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # Base directory of the project
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -9,3 +13,130 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 MODEL_PATH = os.path.join(BASE_DIR, "models", "mobilenetv2_spoof_model.h5")
 CONFIG_PATH = os.path.join(BASE_DIR, "models", "model_config.json")
 
+# Storage backends: "firebase", "local" or "memory". Intermediate artifacts
+# (compressed video, frames, extracted audio) go to the scratch backend.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND") or "firebase"
+SCRATCH_STORAGE_BACKEND = os.getenv("SCRATCH_STORAGE_BACKEND") or STORAGE_BACKEND
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR") or os.path.join(tempfile.gettempdir(), "credify")
+STORAGE_IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS") or 16)
+
+# Origin downloads are streamed in chunks into a spooled temp file that
+# rolls over to disk above DOWNLOAD_SPOOL_MAX_MEMORY.
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_SIZE_MB") or 500) * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE") or 1024 * 1024)
+DOWNLOAD_SPOOL_MAX_MEMORY = int(os.getenv("DOWNLOAD_SPOOL_MAX_MEMORY") or 16 * 1024 * 1024)
+
+# Shared aiohttp client used for origin downloads. Timeouts are in seconds;
+# 0 disables a timeout.
+HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT") or 100)
+HTTP_CONNECTION_LIMIT_PER_HOST = int(os.getenv("HTTP_CONNECTION_LIMIT_PER_HOST") or 10)
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT") or 30)
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL") or 300)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT") or 10) or None
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT") or 60) or None
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT") or 0) or None
+
+# Endpoint result cache keyed by a digest of the downloaded bytes. The disk
+# tier is only used when RESULT_CACHE_DIR is set. Bump RESULT_CACHE_VERSION
+# whenever preprocessing or response formats change.
+RESULT_CACHE_ENABLED = (os.getenv("RESULT_CACHE_ENABLED") or "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES") or 1024)
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS") or 24 * 60 * 60)
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or None
+RESULT_CACHE_VERSION = os.getenv("RESULT_CACHE_VERSION") or "4"
+
+# Server-side fingerprint registry (SQLite file)
+FINGERPRINT_REGISTRY_PATH = os.getenv("FINGERPRINT_REGISTRY_PATH") or os.path.join(BASE_DIR, "data", "fingerprint_registry.sqlite3")
+
+# Fingerprint videos while they download instead of storing the whole file
+# first. Memory stays bounded regardless of the video length; the result
+# cache is checked once the download has finished.
+FINGERPRINT_STREAMING = (os.getenv("FINGERPRINT_STREAMING") or "false").lower() in ("1", "true", "yes")
+
+# Segment-parallel fingerprinting (non-streaming mode). With
+# FINGERPRINT_WORKERS > 0, videos of at least FINGERPRINT_PARALLEL_MIN_SECONDS
+# are split at keyframes into segments of up to FINGERPRINT_SEGMENT_SECONDS
+# that a pool of FINGERPRINT_WORKERS processes decodes in parallel. The merged
+# fingerprint is identical to the sequential one.
+FINGERPRINT_WORKERS = int(os.getenv("FINGERPRINT_WORKERS") or 0)
+FINGERPRINT_PARALLEL_MIN_SECONDS = float(os.getenv("FINGERPRINT_PARALLEL_MIN_SECONDS") or 120)
+FINGERPRINT_SEGMENT_SECONDS = float(os.getenv("FINGERPRINT_SEGMENT_SECONDS") or 30)
+
+# Dynamic micro-batching of model inference across concurrent requests
+INFERENCE_BATCHING_ENABLED = (os.getenv("INFERENCE_BATCHING_ENABLED") or "true").lower() in ("1", "true", "yes")
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE") or 16)
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS") or 5)
+
+# Model execution backend: "native" (Keras / PyTorch) or "onnx" (ONNX Runtime
+# on the exports written by scripts/export_onnx.py). Models without an ONNX
+# export fall back to the native backend.
+INFERENCE_BACKEND = (os.getenv("INFERENCE_BACKEND") or "native").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR") or os.path.join(BASE_DIR, "models", "onnx")
+
+# Opt-in reduced precision for the native backend: "fp32", "int8" or
+# "float16". Applies to the GAN, image manipulation and deepfake video Keras
+# models (converted to TFLite and cached in QUANTIZED_MODEL_DIR) and to the
+# ViT face model (dynamic INT8; float16 leaves it at fp32).
+INFERENCE_PRECISION = (os.getenv("INFERENCE_PRECISION") or "fp32").lower()
+QUANTIZED_MODEL_DIR = os.getenv("QUANTIZED_MODEL_DIR") or os.path.join(BASE_DIR, "models", "quantized")
+
+# Worker processes per model. 0 runs inference inside the API process; N > 0
+# starts N processes per model that each load their own copy, with inputs and
+# outputs passed through shared memory.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS") or 0)
+
+# CPU thread budget (see app/core/cpu_budget.py). CPU_THREADS=0 uses the cores
+# available to the process; MODEL_INTRA_OP_THREADS=0 derives the per-model
+# TensorFlow / PyTorch / ONNX Runtime / TFLite pool size from it.
+CPU_THREADS = int(os.getenv("CPU_THREADS") or 0)
+MODEL_INTRA_OP_THREADS = int(os.getenv("MODEL_INTRA_OP_THREADS") or 0)
+MODEL_INTER_OP_THREADS = int(os.getenv("MODEL_INTER_OP_THREADS") or 1)
+OPENCV_THREADS = int(os.getenv("OPENCV_THREADS") or 1)
+BLAS_THREADS = int(os.getenv("BLAS_THREADS") or 1)
+# FFmpeg video decoding threads for every PyAV decode: VIDEO_DECODE_THREAD_TYPE
+# is "AUTO" (frame and slice threading), "FRAME", "SLICE" or "NONE" (single
+# threaded); VIDEO_DECODE_THREADS=0 uses the cores available to the process.
+VIDEO_DECODE_THREAD_TYPE = (os.getenv("VIDEO_DECODE_THREAD_TYPE") or "AUTO").upper()
+VIDEO_DECODE_THREADS = int(os.getenv("VIDEO_DECODE_THREADS") or 0)
+
+# Image forgery cascade. "full" runs every stage; "exit_on_fake" stops once a
+# stage flags the image as fake with at least CASCADE_FAKE_THRESHOLD
+# confidence; "exit_on_decisive" also stops once CASCADE_MIN_STAGES or more
+# stages have all called it real with at least CASCADE_REAL_THRESHOLD.
+# Stages run in CASCADE_STAGES order, cheapest first.
+CASCADE_POLICY = (os.getenv("CASCADE_POLICY") or "full").lower()
+CASCADE_STAGES = [stage.strip() for stage in (os.getenv("CASCADE_STAGES") or "image_manipulation,gan_detection,face_manipulation").split(",") if stage.strip()]
+CASCADE_FAKE_THRESHOLD = float(os.getenv("CASCADE_FAKE_THRESHOLD") or 0.95)
+CASCADE_REAL_THRESHOLD = float(os.getenv("CASCADE_REAL_THRESHOLD") or 0.98)
+CASCADE_MIN_STAGES = int(os.getenv("CASCADE_MIN_STAGES") or 2)
+
+# Video forgery frame sampling: "uniform" (evenly spaced seeks), "keyframes"
+# (keyframe-only decoding) or "scene" (frame budget spread across detected
+# scenes). Scene cuts are found on thumbnails sampled SCENE_SAMPLE_FPS times
+# a second whose mean absolute difference exceeds SCENE_CHANGE_THRESHOLD (0-1).
+# Scene mode decodes the whole clip to find cuts and costs several times
+# more than uniform sampling; SCENE_DETECTION_SKIP_FRAME=NONKEY only decodes
+# keyframes for detection, which is far cheaper but only finds cuts where
+# the encoder placed a keyframe (the default NONREF skips non-reference frames).
+FRAME_SAMPLING_MODE = (os.getenv("FRAME_SAMPLING_MODE") or "uniform").lower()
+FRAME_SAMPLE_BUDGET = int(os.getenv("FRAME_SAMPLE_BUDGET") or 20)
+SCENE_CHANGE_THRESHOLD = float(os.getenv("SCENE_CHANGE_THRESHOLD") or 0.15)
+SCENE_SAMPLE_FPS = float(os.getenv("SCENE_SAMPLE_FPS") or 4)
+SCENE_DETECTION_SKIP_FRAME = (os.getenv("SCENE_DETECTION_SKIP_FRAME") or "NONREF").upper()
+
+# Video forgery transcoding. "auto" analyzes the original upload and only
+# transcodes it when it cannot be decoded or exceeds a limit below; "always"
+# transcodes every video first; "never" always analyzes the original.
+# Transcodes use libx264 with VIDEO_TRANSCODE_PRESET and
+# VIDEO_TRANSCODE_THREADS encoder threads (0 uses every available core).
+VIDEO_TRANSCODE_POLICY = (os.getenv("VIDEO_TRANSCODE_POLICY") or "auto").lower()
+VIDEO_TRANSCODE_PRESET = os.getenv("VIDEO_TRANSCODE_PRESET") or "veryfast"
+VIDEO_TRANSCODE_THREADS = int(os.getenv("VIDEO_TRANSCODE_THREADS") or 0)
+VIDEO_MAX_DURATION = int(os.getenv("VIDEO_MAX_DURATION") or 60)
+VIDEO_MAX_WIDTH = int(os.getenv("VIDEO_MAX_WIDTH") or 1280)
+VIDEO_MAX_HEIGHT = int(os.getenv("VIDEO_MAX_HEIGHT") or 720)
+VIDEO_MAX_SIZE_MB = int(os.getenv("VIDEO_MAX_SIZE_MB") or 50)
+
+# Model groups loaded at startup before /ready reports ready: any of
+# "forgery", "liveness", "audio", or "all". Other models load on first use.
+PRELOAD_MODEL_GROUPS = [group.strip() for group in (os.getenv("PRELOAD_MODEL_GROUPS") or "").split(",") if group.strip()]
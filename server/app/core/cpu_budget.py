@@ -0,0 +1,126 @@
+# Central CPU thread budget for every runtime that keeps its own thread pool.
+# Nothing here imports numpy, TensorFlow or PyTorch at module level, because
+# the BLAS limits only take effect if they are set before numpy is loaded.
+import os
+import sys
+import logging
+from app.core.config import (
+    CPU_THREADS, MODEL_INTRA_OP_THREADS, MODEL_INTER_OP_THREADS, OPENCV_THREADS, BLAS_THREADS, INFERENCE_WORKERS,
+    VIDEO_DECODE_THREAD_TYPE, VIDEO_DECODE_THREADS
+)
+
+DECODE_THREAD_TYPES = ("AUTO", "FRAME", "SLICE", "NONE")
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+_in_worker = False
+_decode_threads_limit = None
+_configured = set()
+
+def available_cpus() -> int:
+    if CPU_THREADS:
+        return CPU_THREADS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def model_threads(in_worker: bool = None) -> int:
+    """
+    Intra-op threads per model runtime. In the API process TensorFlow and
+    PyTorch share the cores, so each gets half; in a worker process the cores
+    are split between that model's workers.
+    """
+    if MODEL_INTRA_OP_THREADS:
+        return MODEL_INTRA_OP_THREADS
+    in_worker = _in_worker if in_worker is None else in_worker
+    if in_worker:
+        return max(1, available_cpus() // max(1, INFERENCE_WORKERS))
+    return max(1, available_cpus() // 2)
+
+def mark_inference_worker():
+    global _in_worker
+    _in_worker = True
+
+def apply_process_limits():
+    """Set BLAS / OpenMP thread limits; call before numpy is imported. Explicit env settings win."""
+    for var in BLAS_ENV_VARS:
+        os.environ.setdefault(var, str(BLAS_THREADS))
+    if "numpy" in sys.modules:
+        logging.warning("numpy was imported before the CPU budget was applied; BLAS thread limits may not take effect")
+
+def configure_opencv():
+    if "opencv" in _configured:
+        return
+    import cv2
+    cv2.setNumThreads(OPENCV_THREADS)
+    _configured.add("opencv")
+
+def configure_tensorflow():
+    """Must run before TensorFlow executes its first op."""
+    if "tensorflow" in _configured:
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(model_threads())
+        tf.config.threading.set_inter_op_parallelism_threads(MODEL_INTER_OP_THREADS)
+    except RuntimeError as e:
+        logging.warning(f"TensorFlow thread pools already initialized; budget not applied: {str(e)}")
+    _configured.add("tensorflow")
+
+def configure_torch():
+    if "torch" in _configured:
+        return
+    import torch
+    torch.set_num_threads(model_threads())
+    try:
+        torch.set_interop_threads(MODEL_INTER_OP_THREADS)
+    except RuntimeError as e:
+        logging.warning(f"PyTorch inter-op pool already started; budget not applied: {str(e)}")
+    _configured.add("torch")
+
+def video_decode_threads() -> int:
+    if VIDEO_DECODE_THREAD_TYPE == "NONE":
+        return 1
+    return VIDEO_DECODE_THREADS or _decode_threads_limit or available_cpus()
+
+def limit_video_decode_threads(threads: int):
+    """Default decode thread count for this process, e.g. one of several decoding worker processes."""
+    global _decode_threads_limit
+    _decode_threads_limit = threads
+
+def configure_video_decoder(stream):
+    """Apply the decode threading settings to a PyAV video stream; must run before its first decode."""
+    if VIDEO_DECODE_THREAD_TYPE not in DECODE_THREAD_TYPES:
+        raise ValueError(f"Unknown VIDEO_DECODE_THREAD_TYPE '{VIDEO_DECODE_THREAD_TYPE}'. Expected one of: {', '.join(DECODE_THREAD_TYPES)}")
+    if VIDEO_DECODE_THREAD_TYPE != "NONE":
+        stream.codec_context.thread_type = VIDEO_DECODE_THREAD_TYPE
+        stream.codec_context.thread_count = video_decode_threads()
+    return stream
+
+def cpu_budget_report() -> dict:
+    """The configured budget plus the values each loaded runtime actually reports."""
+    report = {
+        "available_cpus": available_cpus(),
+        "inference_workers": INFERENCE_WORKERS,
+        "model_intra_op_threads": model_threads(in_worker=False),
+        "model_intra_op_threads_per_worker": model_threads(in_worker=True) if INFERENCE_WORKERS else None,
+        "model_inter_op_threads": MODEL_INTER_OP_THREADS,
+        "opencv_threads": OPENCV_THREADS,
+        "video_decode": {"thread_type": VIDEO_DECODE_THREAD_TYPE, "threads": video_decode_threads()},
+        "blas_threads": {var: os.environ.get(var) for var in BLAS_ENV_VARS},
+    }
+    if "cv2" in sys.modules:
+        report["opencv_threads"] = sys.modules["cv2"].getNumThreads()
+    if "tensorflow" in _configured:
+        tf = sys.modules["tensorflow"]
+        report["tensorflow"] = {
+            "intra_op_threads": tf.config.threading.get_intra_op_parallelism_threads(),
+            "inter_op_threads": tf.config.threading.get_inter_op_parallelism_threads(),
+        }
+    if "torch" in _configured:
+        torch = sys.modules["torch"]
+        report["torch"] = {
+            "intra_op_threads": torch.get_num_threads(),
+            "inter_op_threads": torch.get_num_interop_threads(),
+        }
+    return report
@@ -37,5 +37,3 @@ def initialize_firebase():
         return _firebase_bucket
     except Exception as e:
         raise RuntimeError(f"Error initializing Firebase: {e}")
-
-firebase_bucket = initialize_firebase()
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Optional
+import aiohttp
+from app.core.config import (
+    HTTP_CONNECTION_LIMIT, HTTP_CONNECTION_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_TOTAL_TIMEOUT
+)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_CONNECTION_LIMIT,
+        limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT,
+        sock_connect=HTTP_CONNECT_TIMEOUT,
+        sock_read=HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def start_http_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logging.info(f"HTTP client session started (limit={HTTP_CONNECTION_LIMIT}, per_host={HTTP_CONNECTION_LIMIT_PER_HOST})")
+    return _session
+
+async def close_http_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        # Give the connector a moment to close the underlying transports.
+        await asyncio.sleep(0)
+        logging.info("HTTP client session closed")
+    _session = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the app-lifetime client session, creating it on first use if the
+    startup event has not run (e.g. when services are used outside FastAPI).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
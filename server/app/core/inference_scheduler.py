@@ -0,0 +1,127 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+import numpy as np
+from app.core.config import INFERENCE_BATCHING_ENABLED, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS
+
+class _Job:
+    __slots__ = ("batch", "future")
+
+    def __init__(self, batch: np.ndarray):
+        self.batch = batch
+        self.future = Future()
+
+class BatchingPredictor:
+    """
+    Dynamic micro-batching in front of a model's predict function.
+
+    Callers from any thread submit inputs with a leading batch dimension; a
+    single worker thread per model gathers pending inputs until it has
+    max_batch_size rows or max_wait_ms has passed since the first one
+    arrived, runs one forward pass on the concatenated batch, and hands each
+    caller back its own rows. Inputs with different trailing shapes are run
+    as separate batches. With concurrency > 1 (e.g. a pool of worker
+    processes behind predict_fn) that many batches can be in flight at once.
+    """
+    def __init__(self, name: str, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+                 max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+                 enabled: bool = INFERENCE_BATCHING_ENABLED,
+                 concurrency: int = 1):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.enabled = enabled
+        self.concurrency = max(1, concurrency)
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._workers = []
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if not self._workers:
+            with self._worker_lock:
+                if not self._workers:
+                    for index in range(self.concurrency):
+                        worker = threading.Thread(target=self._run, name=f"inference-{self.name}-{index}", daemon=True)
+                        worker.start()
+                        self._workers.append(worker)
+
+    def submit(self, batch: np.ndarray) -> Future:
+        batch = np.asarray(batch)
+        if not self.enabled:
+            future = Future()
+            try:
+                future.set_result(self._predict_chunked(batch))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_worker()
+        job = _Job(batch)
+        self._queue.put(job)
+        return job.future
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Blocking predict for an input that already has a batch dimension."""
+        return self.submit(batch).result()
+
+    def predict(self, sample: np.ndarray) -> np.ndarray:
+        """Blocking predict for a single sample without a batch dimension."""
+        return self.predict_batch(np.expand_dims(sample, axis=0))[0]
+
+    async def predict_batch_async(self, batch: np.ndarray) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(batch))
+
+    def _predict_chunked(self, batch: np.ndarray) -> np.ndarray:
+        if len(batch) <= self.max_batch_size:
+            return np.asarray(self.predict_fn(batch))
+        outputs = [np.asarray(self.predict_fn(batch[i:i + self.max_batch_size]))
+                   for i in range(0, len(batch), self.max_batch_size)]
+        return np.concatenate(outputs)
+
+    def _collect(self) -> List[_Job]:
+        jobs = [self._queue.get()]
+        rows = len(jobs[0].batch)
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            rows += len(job.batch)
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._collect()
+            groups = {}
+            for job in jobs:
+                key = (job.batch.shape[1:], job.batch.dtype.str)
+                groups.setdefault(key, []).append(job)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, jobs: List[_Job]):
+        try:
+            batch = np.concatenate([job.batch for job in jobs]) if len(jobs) > 1 else jobs[0].batch
+            outputs = self._predict_chunked(batch)
+            if len(jobs) > 1:
+                logging.debug(f"{self.name}: ran {len(jobs)} requests as one batch of {len(batch)}")
+            offset = 0
+            for job in jobs:
+                rows = len(job.batch)
+                job.future.set_result(outputs[offset:offset + rows])
+                offset += rows
+        except Exception as e:
+            logging.error(f"Batched inference failed for {self.name}: {str(e)}")
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
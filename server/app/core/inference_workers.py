@@ -0,0 +1,181 @@
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+import numpy as np
+
+def _load_local_runner(name: str):
+    from app.core.cpu_budget import mark_inference_worker
+    from app.core.model_backend import load_model_runner
+    mark_inference_worker()
+    return load_model_runner(name, workers=0)
+
+def _attach(shm: Optional[shared_memory.SharedMemory], name: str) -> shared_memory.SharedMemory:
+    """Reuse an attached segment while its name is unchanged, otherwise attach the new one."""
+    if shm is not None and shm.name == name:
+        return shm
+    if shm is not None:
+        shm.close()
+    return shared_memory.SharedMemory(name=name)
+
+def _worker_main(name: str, conn, loader: Callable):
+    """
+    Worker process loop: load the model once, then for every request read the
+    input batch from the parent's shared-memory segment and write the output
+    into a segment owned by this worker. Only names, shapes and dtypes cross
+    the pipe.
+    """
+    try:
+        runner = loader(name)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", runner.backend))
+
+    input_shm = None
+    output_shm = None
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            input_name, shape, dtype = message
+            try:
+                input_shm = _attach(input_shm, input_name)
+                batch = np.ndarray(shape, dtype=dtype, buffer=input_shm.buf)
+                outputs = np.ascontiguousarray(runner.predict(batch))
+                if output_shm is None or output_shm.size < outputs.nbytes:
+                    if output_shm is not None:
+                        output_shm.close()
+                        output_shm.unlink()
+                    output_shm = shared_memory.SharedMemory(create=True, size=max(outputs.nbytes, 1))
+                np.ndarray(outputs.shape, dtype=outputs.dtype, buffer=output_shm.buf)[...] = outputs
+                conn.send(("ok", output_shm.name, outputs.shape, outputs.dtype.str))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if input_shm is not None:
+            input_shm.close()
+        if output_shm is not None:
+            output_shm.close()
+            output_shm.unlink()
+
+class _Worker:
+    """Parent-side handle for one worker process and its shared-memory buffers."""
+    def __init__(self, context, name: str, index: int, loader: Callable):
+        self.name = name
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(name, child_conn, loader),
+            name=f"inference-{name}-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.input_shm = None
+        self.output_shm = None
+        status, detail = self.conn.recv()
+        if status != "ready":
+            self.process.join()
+            raise RuntimeError(f"Inference worker for {name} failed to start: {detail}")
+        self.backend = detail
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch)
+        if self.input_shm is None or self.input_shm.size < batch.nbytes:
+            self._release_input()
+            self.input_shm = shared_memory.SharedMemory(create=True, size=max(batch.nbytes, 1))
+        np.ndarray(batch.shape, dtype=batch.dtype, buffer=self.input_shm.buf)[...] = batch
+
+        self.conn.send((self.input_shm.name, batch.shape, batch.dtype.str))
+        reply = self.conn.recv()
+        if reply[0] != "ok":
+            raise RuntimeError(f"Inference failed in worker for {self.name}: {reply[1]}")
+        _, output_name, shape, dtype = reply
+        self.output_shm = _attach(self.output_shm, output_name)
+        return np.ndarray(shape, dtype=dtype, buffer=self.output_shm.buf).copy()
+
+    def _release_input(self):
+        if self.input_shm is not None:
+            self.input_shm.close()
+            self.input_shm.unlink()
+            self.input_shm = None
+
+    def close(self):
+        try:
+            if self.process.is_alive():
+                self.conn.send(None)
+                self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        except (OSError, ValueError):
+            pass
+        if self.output_shm is not None:
+            self.output_shm.close()
+            # A worker that did not exit cleanly could not unlink its own output segment
+            if self.process.exitcode != 0:
+                try:
+                    self.output_shm.unlink()
+                except FileNotFoundError:
+                    pass
+            self.output_shm = None
+        self._release_input()
+        self.conn.close()
+
+class ProcessPoolRunner:
+    """
+    Runner that executes a model in a pool of worker processes, one model copy
+    per process. Each call is served by an idle worker; input and output
+    arrays travel through per-worker shared-memory buffers that are reused
+    across calls and only grow when a larger batch arrives. A worker that
+    dies is replaced on the next call.
+    """
+    def __init__(self, name: str, workers: int, loader: Callable = _load_local_runner):
+        self.name = name
+        self.loader = loader
+        self.concurrency = workers
+        # TensorFlow and PyTorch are not fork-safe
+        self._context = mp.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        for index in range(workers):
+            self._start_worker(index)
+        self.backend = f"process-{self._workers[0].backend}"
+        logging.info(f"Started {workers} inference worker process(es) for {name} ({self.backend})")
+        atexit.register(self.close)
+
+    def _start_worker(self, index: int) -> _Worker:
+        worker = _Worker(self._context, self.name, index, self.loader)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+        return worker
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        worker = self._idle.get()
+        try:
+            result = worker.predict(batch)
+        except (EOFError, OSError) as e:
+            logging.error(f"Inference worker for {self.name} exited unexpectedly: {str(e)}; restarting it")
+            with self._lock:
+                self._workers.remove(worker)
+                index = len(self._workers)
+            worker.close()
+            self._start_worker(index)
+            raise RuntimeError(f"Inference worker for {self.name} exited unexpectedly") from e
+        except Exception:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+        return result
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
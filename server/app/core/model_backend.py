@@ -0,0 +1,194 @@
+import os
+import logging
+import threading
+import numpy as np
+from app.core.config import (
+    BASE_DIR, INFERENCE_BACKEND, ONNX_MODEL_DIR, INFERENCE_PRECISION, QUANTIZED_MODEL_DIR, INFERENCE_WORKERS,
+    MODEL_INTER_OP_THREADS
+)
+from app.core.cpu_budget import model_threads, configure_tensorflow, configure_torch
+
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+# Bundled models by name, with the file each one is loaded from in models/
+MODEL_FILES = {
+    "gan_model": "gan_model.h5",
+    "image_manipulation_detection_model": "image_manipulation_detection_model.h5",
+    "deepfake_videos": "deepfake_videos.h5",
+    "mobilenetv2_spoof_model": "mobilenetv2_spoof_model.h5",
+    "DeepFakeVoiceDetector_V1": "DeepFakeVoiceDetector_V1.h5",
+    "deepfake_model": "deepfake_model.pth",
+}
+
+# Models that INFERENCE_PRECISION applies to
+QUANTIZABLE_MODELS = {"gan_model", "image_manipulation_detection_model", "deepfake_videos", "deepfake_model"}
+PRECISIONS = ("fp32", "int8", "float16")
+
+def model_file_path(name: str) -> str:
+    return os.path.join(MODEL_DIR, MODEL_FILES[name])
+
+def onnx_model_path(name: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, f"{name}.onnx")
+
+def parity_data_path(name: str) -> str:
+    """Inputs and native outputs recorded at export time for parity checks."""
+    return os.path.join(ONNX_MODEL_DIR, f"{name}.parity.npz")
+
+# Runners share one interface: predict(batch) -> np.ndarray, a backend label,
+# and how many batches they can run at once (concurrency).
+class KerasRunner:
+    concurrency = 1
+
+    def __init__(self, model):
+        self.model = model
+        self.backend = "keras"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch, verbose=0)
+
+class TorchRunner:
+    """Runs a Hugging Face image classifier and returns its logits."""
+    concurrency = 1
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+        self.backend = "torch"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        import torch
+        with torch.no_grad():
+            outputs = self.model(pixel_values=torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32)).to(self.device))
+        return outputs.logits.cpu().numpy()
+
+class TFLiteRunner:
+    """Runs a TFLite flatbuffer, resizing the input tensor to each batch size."""
+    concurrency = 1
+
+    def __init__(self, path: str, precision: str):
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=model_threads())
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.input_shape = None
+        # The interpreter is not thread-safe
+        self._lock = threading.Lock()
+        self.backend = f"tflite-{precision}"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape != self.input_shape:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.input_shape = batch.shape
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+class OnnxRunner:
+    concurrency = 1
+
+    def __init__(self, path: str):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = model_threads()
+        options.inter_op_num_threads = MODEL_INTER_OP_THREADS
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.backend = "onnx"
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        feed = {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)}
+        return self.session.run(None, feed)[0]
+
+def quantized_model_path(name: str, precision: str) -> str:
+    return os.path.join(QUANTIZED_MODEL_DIR, f"{name}.{precision}.tflite")
+
+def convert_keras_to_tflite(name: str, model, precision: str) -> str:
+    """
+    Convert a Keras model to TFLite with dynamic-range INT8 or float16 weights.
+    The result is cached on disk and rebuilt when the source model changes.
+    """
+    import tensorflow as tf
+    path = quantized_model_path(name, precision)
+    source = model_file_path(name)
+    if os.path.exists(path) and (not os.path.exists(source) or os.path.getmtime(path) >= os.path.getmtime(source)):
+        return path
+
+    logging.info(f"Converting {name} to {precision} TFLite at {path}")
+    signature = [tf.TensorSpec([None] + list(model.inputs[0].shape[1:]), tf.float32)]
+
+    @tf.function(input_signature=signature)
+    def serve(x):
+        return model(x, training=False)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    flatbuffer = converter.convert()
+
+    os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+    with open(f"{path}.part", "wb") as f:
+        f.write(flatbuffer)
+    os.replace(f"{path}.part", path)
+    return path
+
+def quantize_runner(name: str, runner, precision: str):
+    """Return a reduced-precision version of a native runner."""
+    if precision == "fp32":
+        return runner
+    if isinstance(runner, KerasRunner):
+        return TFLiteRunner(convert_keras_to_tflite(name, runner.model, precision), precision)
+    if isinstance(runner, TorchRunner):
+        if precision != "int8":
+            logging.info(f"{name}: {precision} is not used for PyTorch models on CPU; keeping fp32")
+            return runner
+        import torch
+        quantized = torch.quantization.quantize_dynamic(runner.model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized_runner = TorchRunner(quantized, runner.device)
+        quantized_runner.backend = "torch-int8"
+        return quantized_runner
+    return runner
+
+def load_native_runner(name: str):
+    if MODEL_FILES[name].endswith(".h5"):
+        configure_tensorflow()
+        import tensorflow as tf
+        return KerasRunner(tf.keras.models.load_model(model_file_path(name)))
+    configure_torch()
+    import torch
+    from app.services.face_manipulation_service import load_face_manipulation_model
+    device = torch.device("cpu")
+    return TorchRunner(load_face_manipulation_model(device), device)
+
+def load_model_runner(name: str, backend: str = INFERENCE_BACKEND,
+                      precision: str = INFERENCE_PRECISION, workers: int = INFERENCE_WORKERS):
+    """
+    Load the named model with the configured inference backend. The native
+    runner (load_native_runner) is used for the "native" backend, or when the
+    ONNX export for this model is missing. Reduced precision applies to native runners of
+    QUANTIZABLE_MODELS. With workers > 0 the model is loaded in that many
+    worker processes instead of this one.
+    """
+    if workers > 0:
+        from app.core.inference_workers import ProcessPoolRunner
+        return ProcessPoolRunner(name, workers)
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown inference precision '{precision}'. Expected one of: {', '.join(PRECISIONS)}")
+    if backend == "onnx":
+        path = onnx_model_path(name)
+        if os.path.exists(path):
+            logging.info(f"Loading {name} with ONNX Runtime from {path}")
+            return OnnxRunner(path)
+        logging.warning(f"ONNX export for {name} not found at {path}; falling back to the native model")
+    elif backend != "native":
+        raise ValueError(f"Unknown inference backend '{backend}'. Expected 'native' or 'onnx'")
+    runner = load_native_runner(name)
+    if name in QUANTIZABLE_MODELS and precision != "fp32":
+        logging.info(f"Loading {name} with {precision} precision")
+        runner = quantize_runner(name, runner, precision)
+    return runner
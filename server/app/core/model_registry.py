@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+from fastapi.concurrency import run_in_threadpool
+
+class _Entry:
+    __slots__ = ("factory", "group", "instance", "load_seconds", "lock")
+
+    def __init__(self, factory: Callable[[], Any], group: str):
+        self.factory = factory
+        self.group = group
+        self.instance = None
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """
+    Lazily constructed model services. Each service is built on first use
+    (or by preload) exactly once, so endpoints only pay for the models they
+    actually call. Services are grouped by endpoint so deployments can
+    preload the groups they serve before reporting ready.
+    """
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._ready = threading.Event()
+        self.preload_error = None
+        self.timings: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], group: str):
+        self._entries[name] = _Entry(factory, group)
+
+    def groups(self) -> List[str]:
+        return sorted({entry.group for entry in self._entries.values()})
+
+    def get(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.instance is None:
+            with entry.lock:
+                if entry.instance is None:
+                    started = time.perf_counter()
+                    entry.instance = entry.factory()
+                    entry.load_seconds = time.perf_counter() - started
+                    logging.info(f"Loaded model service '{name}' in {entry.load_seconds:.2f}s")
+        return entry.instance
+
+    async def get_async(self, name: str) -> Any:
+        """get() for async callers; a first-time load runs off the event loop."""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            return entry.instance
+        return await run_in_threadpool(self.get, name)
+
+    async def preload(self, groups: Iterable[str]):
+        """
+        Load every service in the given groups ("all" selects every group), then
+        mark the registry ready. If a load fails the registry stays not ready
+        and the error is kept for /ready.
+        """
+        groups = set(groups)
+        if "all" in groups:
+            groups = set(self.groups())
+        unknown = groups - set(self.groups())
+        if unknown:
+            logging.warning(f"Ignoring unknown model groups: {', '.join(sorted(unknown))}")
+        started = time.perf_counter()
+        try:
+            for name, entry in self._entries.items():
+                if entry.group in groups:
+                    await self.get_async(name)
+        except Exception as e:
+            self.preload_error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.timings["preload_seconds"] = time.perf_counter() - started
+        self._ready.set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "error": self.preload_error,
+            "timings": {key: round(value, 3) for key, value in self.timings.items()},
+            "models": {
+                name: {
+                    "group": entry.group,
+                    "loaded": entry.instance is not None,
+                    "load_seconds": None if entry.load_seconds is None else round(entry.load_seconds, 3)
+                }
+                for name, entry in self._entries.items()
+            }
+        }
+
+# Factories import their service modules so TensorFlow / PyTorch are only
+# imported when a model is first needed.
+def _image_manipulation():
+    from app.services.image_manipulation_service import ImageManipulationService
+    return ImageManipulationService()
+
+def _face_manipulation():
+    from app.services.face_manipulation_service import FaceManipulationService
+    return FaceManipulationService()
+
+def _gan_detection():
+    from app.services.gan_detection_service import GANDetectionService
+    return GANDetectionService()
+
+def _deepfake_video():
+    from app.services.deepfake_video_detection import DeepfakeVideoDetectionService
+    return DeepfakeVideoDetectionService()
+
+def _audio_deepfake():
+    from app.services.audio_deepfake_service import AudioDeepfakeService
+    return AudioDeepfakeService()
+
+def _antispoof():
+    from app.services.antispoof_service import AntispoofService
+    return AntispoofService()
+
+model_registry = ModelRegistry()
+model_registry.register("image_manipulation", _image_manipulation, group="forgery")
+model_registry.register("face_manipulation", _face_manipulation, group="forgery")
+model_registry.register("gan_detection", _gan_detection, group="forgery")
+model_registry.register("deepfake_video", _deepfake_video, group="forgery")
+model_registry.register("audio_deepfake", _audio_deepfake, group="audio")
+model_registry.register("antispoof", _antispoof, group="liveness")
@@ -0,0 +1,134 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from app.core.config import (
+    BASE_DIR, RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_DIR, RESULT_CACHE_VERSION, INFERENCE_BACKEND, INFERENCE_PRECISION
+)
+
+_models_version = None
+
+def models_version() -> str:
+    """
+    Identify the deployed model set by the name, size and mtime of every file
+    under models/, so swapping a model invalidates cached results.
+    """
+    global _models_version
+    if _models_version is None:
+        h = hashlib.sha256()
+        models_dir = os.path.join(BASE_DIR, "models")
+        for root, _, files in sorted(os.walk(models_dir)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                h.update(f"{os.path.relpath(os.path.join(root, name), models_dir)}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+        _models_version = h.hexdigest()[:16]
+    return _models_version
+
+class ResultCache:
+    """
+    Two-tier cache for endpoint results keyed by a content digest. The memory
+    tier is an LRU bounded by max_entries; the optional disk tier stores one
+    JSON file per key and survives restarts. Both tiers expire after ttl_seconds.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def make_key(self, namespace: str, digest: str) -> str:
+        raw = f"{namespace}:{digest}:{RESULT_CACHE_VERSION}:{INFERENCE_BACKEND}:{INFERENCE_PRECISION}:{models_version()}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self._expired(stored_at):
+                    self._entries.move_to_end(key)
+                    return copy.deepcopy(value)
+                del self._entries[key]
+
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable result cache entry {path}: {str(e)}")
+            return None
+        if self._expired(entry["stored_at"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        self._remember(key, entry["stored_at"], entry["value"])
+        return copy.deepcopy(entry["value"])
+
+    def _remember(self, key: str, stored_at: float, value: Any):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set(self, key: str, value: Any):
+        stored_at = time.time()
+        value = copy.deepcopy(value)
+        self._remember(key, stored_at, value)
+
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({"stored_at": stored_at, "value": value}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Could not persist result cache entry: {str(e)}")
+            # Don't leave a half-written entry behind in the cache directory
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class _DisabledResultCache(ResultCache):
+    def __init__(self):
+        super().__init__(max_entries=0, ttl_seconds=0)
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any):
+        pass
+
+result_cache = (
+    ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_DIR)
+    if RESULT_CACHE_ENABLED else _DisabledResultCache()
+)
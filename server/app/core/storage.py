@@ -0,0 +1,142 @@
+import os
+import shutil
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import BinaryIO, Dict, Optional
+from app.core.config import STORAGE_BACKEND, SCRATCH_STORAGE_BACKEND, LOCAL_STORAGE_DIR, STORAGE_IO_WORKERS
+
+class StorageBackend:
+    """
+    Minimal blob store used by app.utils.file_utils. Names are flat keys
+    such as "<uuid>.mp4" or "<uuid>.mp4_frame_3.jpg".
+    """
+    name = "base"
+
+    def upload(self, filename: str, content: bytes, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def upload_file(self, filename: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        self.upload(filename, fileobj.read(), content_type)
+
+    def download(self, filename: str) -> bytes:
+        raise NotImplementedError
+
+    def delete(self, filename: str) -> None:
+        raise NotImplementedError
+
+class FirebaseStorageBackend(StorageBackend):
+    name = "firebase"
+
+    def __init__(self):
+        # Imported lazily so the app can run without Firebase credentials
+        # when another backend is configured.
+        from app.core.firebase_config import initialize_firebase
+        self.bucket = initialize_firebase()
+
+    def upload(self, filename: str, content: bytes, content_type: Optional[str] = None) -> None:
+        blob = self.bucket.blob(filename)
+        blob.upload_from_string(content, content_type=content_type or 'application/octet-stream')
+
+    def upload_file(self, filename: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        blob = self.bucket.blob(filename)
+        blob.upload_from_file(fileobj, rewind=True, content_type=content_type or 'application/octet-stream')
+
+    def download(self, filename: str) -> bytes:
+        return self.bucket.blob(filename).download_as_bytes()
+
+    def delete(self, filename: str) -> None:
+        self.bucket.blob(filename).delete()
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, filename: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, filename))
+        if os.path.dirname(path) != os.path.abspath(self.root):
+            raise ValueError(f"Invalid storage filename: {filename}")
+        return path
+
+    def upload(self, filename: str, content: bytes, content_type: Optional[str] = None) -> None:
+        path = self._path(filename)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def upload_file(self, filename: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        path = self._path(filename)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+
+    def download(self, filename: str) -> bytes:
+        with open(self._path(filename), 'rb') as f:
+            return f.read()
+
+    def delete(self, filename: str) -> None:
+        os.remove(self._path(filename))
+
+class InMemoryStorageBackend(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self._blobs: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, filename: str, content: bytes, content_type: Optional[str] = None) -> None:
+        with self._lock:
+            self._blobs[filename] = bytes(content)
+
+    def download(self, filename: str) -> bytes:
+        with self._lock:
+            if filename not in self._blobs:
+                raise FileNotFoundError(filename)
+            return self._blobs[filename]
+
+    def delete(self, filename: str) -> None:
+        with self._lock:
+            if self._blobs.pop(filename, None) is None:
+                raise FileNotFoundError(filename)
+
+_BACKENDS = {
+    "firebase": FirebaseStorageBackend,
+    "local": LocalStorageBackend,
+    "memory": InMemoryStorageBackend,
+}
+
+_instances: Dict[str, StorageBackend] = {}
+_instances_lock = threading.Lock()
+
+def _get_backend(kind: str) -> StorageBackend:
+    kind = kind.lower()
+    if kind not in _BACKENDS:
+        raise ValueError(f"Unknown storage backend '{kind}'. Expected one of: {', '.join(_BACKENDS)}")
+    with _instances_lock:
+        if kind not in _instances:
+            _instances[kind] = _BACKENDS[kind]()
+            logging.info(f"Initialized {kind} storage backend")
+        return _instances[kind]
+
+def get_storage(scratch: bool = False) -> StorageBackend:
+    """
+    Return the configured storage backend. With scratch=True, returns the
+    backend used for intermediate artifacts that never leave this process.
+    """
+    return _get_backend(SCRATCH_STORAGE_BACKEND if scratch else STORAGE_BACKEND)
+
+# Storage SDK calls (google-cloud-storage, file I/O) are blocking. Async
+# handlers run them on this bounded pool so a slow transfer never stalls
+# the event loop.
+_io_executor = ThreadPoolExecutor(max_workers=STORAGE_IO_WORKERS, thread_name_prefix="storage-io")
+
+async def run_storage_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, partial(func, *args, **kwargs))
@@ -1,10 +1,21 @@
 
+import time
+_import_started = time.perf_counter()
+
+# Thread limits for BLAS / OpenMP must be in place before numpy is imported
+from app.core.cpu_budget import apply_process_limits, configure_opencv, cpu_budget_report
+apply_process_limits()
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from app.api.routes import router
 from app.core.logging_config import configure_logging
-from app.core.firebase_config import initialize_firebase
+from app.core.storage import get_storage
+from app.core.http_client import start_http_session, close_http_session
 from app.api.forgery_routes import router as forgery_router
+from app.core.model_registry import model_registry
+from app.core.config import PRELOAD_MODEL_GROUPS
+import asyncio
 import logging
 import os
 import tempfile
@@ -15,12 +26,34 @@ import numba
 
 numba.config.DISABLE_JIT = True
 
+model_registry.timings["import_seconds"] = time.perf_counter() - _import_started
+
 app = FastAPI()
 
+async def _preload_models():
+    try:
+        await model_registry.preload(PRELOAD_MODEL_GROUPS)
+    except Exception as e:
+        logging.error(f"Model preload failed: {str(e)}", exc_info=True)
+    logging.info(f"Startup report: {model_registry.status()}")
+    logging.info(f"CPU budget: {cpu_budget_report()}")
+
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
     configure_logging()
-    initialize_firebase()
+    configure_opencv()
+    get_storage()
+    get_storage(scratch=True)
+    await start_http_session()
+    model_registry.timings["startup_seconds"] = time.perf_counter() - started
+    # Preloading runs in the background so /health answers immediately;
+    # /ready turns 200 once it finishes.
+    app.state.preload_task = asyncio.create_task(_preload_models())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_session()
 
 app.include_router(router)
 app.include_router(forgery_router)
@@ -1,11 +1,12 @@
 import logging
-from app.core.config import MODEL_PATH, CONFIG_PATH
-from app.utils.file_utils import download_file, remove_temp_file
+from app.core.config import CONFIG_PATH
+from app.utils.file_utils import download_media, remove_temp_file, FileTooLargeError
+from app.core.result_cache import result_cache
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 from fastapi import HTTPException
-from app.core.firebase_config import firebase_bucket
 from io import BytesIO
 from PIL import Image
-import tensorflow as tf
 import json
 import numpy as np
 
@@ -14,10 +15,11 @@ class AntispoofService:
         self.model = None
         self.config = None
         self.load_model_and_config()
+        self.predictor = BatchingPredictor("antispoof", self.model.predict, concurrency=self.model.concurrency)
 
     def load_model_and_config(self):
         try:
-            self.model = tf.keras.models.load_model(MODEL_PATH)
+            self.model = load_model_runner("mobilenetv2_spoof_model")
             with open(CONFIG_PATH, "r") as config_file:
                 self.config = json.load(config_file)
             logging.info("Model and configuration loaded successfully.")
@@ -31,32 +33,39 @@ class AntispoofService:
 
         firebase_filename = None
         try:
-            firebase_filename = await download_file(image_url)
-            
-            blob = firebase_bucket.blob(firebase_filename)
-            image_bytes = blob.download_as_bytes()
+            media = await download_media(image_url)
+            firebase_filename = media.filename
+
+            cache_key = result_cache.make_key("verify_liveness", media.digest)
+            cached_result = result_cache.get(cache_key)
+            if cached_result is not None:
+                logging.info(f"Returning cached liveness result for: {image_url}")
+                return {"image_url": image_url, **cached_result}
+
+            image_bytes = (await media.load()).content
             
             image = Image.open(BytesIO(image_bytes))
             image = image.resize((self.config["img_width"], self.config["img_height"]))
             image_array = np.array(image) / 255.0
             image_array = np.expand_dims(image_array, axis=0)
 
-            prediction = self.model.predict(image_array)[0][0]
+            prediction = (await self.predictor.predict_batch_async(image_array))[0][0]
 
             is_real = bool(prediction <= self.config["threshold"])
             result = "Real" if is_real else "Spoof"
 
-            return {
-                "image_url": image_url,
+            liveness_result = {
                 "prediction_score": float(prediction),
                 "is_real": is_real,
                 "result": result
             }
+            result_cache.set(cache_key, liveness_result)
+            return {"image_url": image_url, **liveness_result}
+        except FileTooLargeError:
+            raise
         except Exception as e:
             logging.error(f"Error processing image: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
         finally:
             if firebase_filename:
-                await remove_temp_file(firebase_filename)
-
-antispoof_service = AntispoofService()
\ No newline at end of file
+                await remove_temp_file(firebase_filename)
\ No newline at end of file
@@ -1,15 +1,17 @@
 import numpy as np
 import librosa as lb
-from tensorflow.keras.models import load_model
 import traceback
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import read_media
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 import io
 import logging
 
 class AudioDeepfakeService:
     def __init__(self):
         logging.info("Initializing AudioDeepfakeService")
-        self.model = load_model("models/DeepFakeVoiceDetector_V1.h5")
+        self.model = load_model_runner("DeepFakeVoiceDetector_V1")
+        self.predictor = BatchingPredictor("audio_deepfake", self.model.predict, concurrency=self.model.concurrency)
         logging.info("AudioDeepfakeService model loaded successfully")
 
     def create_mel_spectrogram_sample(self, audio_content, sr=22050, sample_time=1.5, n_mels=64):
@@ -36,10 +38,10 @@ class AudioDeepfakeService:
             logging.error(traceback.format_exc())
             return None
 
-    def detect_deepfake(self, firebase_filename):
-        logging.info(f"Detecting deepfake for audio file: {firebase_filename}")
+    def detect_deepfake(self, media):
+        logging.info(f"Detecting deepfake for audio file: {media}")
         try:
-            audio_content = get_file_content(firebase_filename)
+            audio_content = read_media(media)
             logging.info(f"Audio content retrieved successfully, size: {len(audio_content)} bytes")
 
             sample = self.create_mel_spectrogram_sample(audio_content)
@@ -48,7 +50,7 @@ class AudioDeepfakeService:
                 return {"prediction": "Error", "confidence": 0.0, "raw_prediction": 0.0}
 
             logging.info("Mel spectrogram sample created")
-            prediction = self.model.predict(np.expand_dims(sample, axis=0))[0][0]
+            prediction = self.predictor.predict(sample)[0]
             logging.info(f"Raw prediction: {prediction}")
 
             is_fake = prediction > 0.5
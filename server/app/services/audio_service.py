@@ -6,39 +6,45 @@ from PIL import Image
 import logging
 import io
 from pydub import AudioSegment
+from app.utils.perceptual_hash import average_hash_columns, to_hex
 
 import ffmpeg
 import numpy as np
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
+def _extract_pcm_with_ffmpeg(video_bytes):
+    out, _ = (
+        ffmpeg
+        .input('pipe:0')
+        .output('pipe:1', format='f32le', acodec='pcm_f32le', ac=1, ar='44100')
+        .run(input=video_bytes, capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.float32)
+
+def extract_audio_pcm(video_bytes):
+    """Decode the audio track to mono 44.1 kHz float PCM, trying pydub first and ffmpeg second."""
+    # Attempt to extract audio using pydub
+    try:
+        logger.info("Attempting to extract audio using pydub")
+        audio = AudioSegment.from_file(io.BytesIO(video_bytes), format="mp4")
+        audio = audio.set_channels(1).set_frame_rate(44100)
+        samples = audio.get_array_of_samples()
+        return np.array(samples).astype(np.float32) / 32768.0
+    except Exception as pydub_error:
+        logger.warning(f"Pydub extraction failed: {str(pydub_error)}. Attempting ffmpeg extraction.")
+        
+        # Fallback to ffmpeg if pydub fails
+        try:
+            return _extract_pcm_with_ffmpeg(video_bytes)
+        except ffmpeg.Error as ffmpeg_error:
+            logger.error(f"FFmpeg extraction failed: {ffmpeg_error.stderr.decode()}")
+            raise
+
 def extract_audio_features(video_bytes):
     logger.info("Extracting audio features")
     try:
-        # Attempt to extract audio using pydub
-        try:
-            logger.info("Attempting to extract audio using pydub")
-            audio = AudioSegment.from_file(io.BytesIO(video_bytes), format="mp4")
-            audio = audio.set_channels(1).set_frame_rate(44100)
-            samples = audio.get_array_of_samples()
-            audio_array = np.array(samples).astype(np.float32) / 32768.0
-        except Exception as pydub_error:
-            logger.warning(f"Pydub extraction failed: {str(pydub_error)}. Attempting ffmpeg extraction.")
-            
-            # Fallback to ffmpeg if pydub fails
-            try:
-                out, _ = (
-                    ffmpeg
-                    .input('pipe:0')
-                    .output('pipe:1', format='f32le', acodec='pcm_f32le', ac=1, ar='44100')
-                    .run(input=video_bytes, capture_stdout=True, capture_stderr=True)
-                )
-                audio_array = np.frombuffer(out, np.float32)
-            except ffmpeg.Error as ffmpeg_error:
-                logger.error(f"FFmpeg extraction failed: {ffmpeg_error.stderr.decode()}")
-                raise
-
-        # Extract MFCC features
-        mfcc = librosa.feature.mfcc(y=audio_array, sr=44100, n_mfcc=13)
+        audio_array = extract_audio_pcm(video_bytes)
+        mfcc = compute_audio_features_from_pcm(audio_array)
         
         logger.info("Audio features extracted successfully")
         return mfcc
@@ -46,6 +52,10 @@ def extract_audio_features(video_bytes):
     except Exception as e:
         logger.error(f"Error extracting audio features: {str(e)}", exc_info=True)
         raise
+
+def compute_audio_features_from_pcm(audio_array):
+    # Extract MFCC features from mono 44.1 kHz float PCM
+    return librosa.feature.mfcc(y=audio_array, sr=44100, n_mfcc=13)
     
 def compute_audio_hash(features):
     logging.info("Computing audio hash.")
@@ -60,26 +70,117 @@ def compute_audio_hash(features):
 def compute_audio_hashes(video_bytes):
     logger.info("Computing audio hashes")
     try:
-        out, _ = (
-            ffmpeg
-            .input('pipe:0')
-            .output('pipe:1', format='f32le', acodec='pcm_f32le', ac=1, ar='44100')
-            .run(input=video_bytes, capture_stdout=True, capture_stderr=True)
-        )
-        
-        audio_array = np.frombuffer(out, np.float32)
-        mfccs = librosa.feature.mfcc(y=audio_array, sr=44100, n_mfcc=13)
-        
-        audio_hashes = []
-        for mfcc in mfccs.T:
-            audio_hash = imagehash.average_hash(Image.fromarray(mfcc.reshape(13, 1)))
-            audio_hashes.append(str(audio_hash))
-        
-        logger.info("Finished computing audio hashes.")
-        return audio_hashes
+        audio_array = _extract_pcm_with_ffmpeg(video_bytes)
+        return compute_audio_hashes_from_pcm(audio_array)
     except ffmpeg.Error as e:
         logger.error(f"FFmpeg error in compute_audio_hashes: {e.stderr.decode()}")
         raise
     except Exception as e:
         logger.error(f"Error in compute_audio_hashes: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+def compute_audio_hashes_from_mfcc(mfccs):
+    # One average hash per MFCC window, computed for all windows at once
+    audio_hashes = to_hex(average_hash_columns(mfccs.T))
+    
+    logger.info("Finished computing audio hashes.")
+    return audio_hashes
+
+def compute_audio_hashes_from_pcm(audio_array):
+    return compute_audio_hashes_from_mfcc(compute_audio_features_from_pcm(audio_array))
+
+def compute_audio_fingerprint(audio_array):
+    """
+    Compute the collective audio hash and the per-window audio hashes from a
+    single MFCC matrix. Returns (audio_hash, audio_hashes).
+    """
+    return compute_audio_fingerprint_from_mfcc(compute_audio_features_from_pcm(audio_array))
+
+def compute_audio_fingerprint_from_mfcc(mfcc):
+    return compute_audio_hash(mfcc), compute_audio_hashes_from_mfcc(mfcc)
+
+# STFT parameters of librosa.feature.mfcc's defaults, used by the block-wise MFCC helpers
+MFCC_N_FFT = 2048
+MFCC_HOP_LENGTH = 512
+MFCC_TOP_DB = 80.0
+# Blocks narrower than a few frames take a different BLAS path in the mel
+# projection and round differently, so blocks never go below this many frames.
+MFCC_MIN_BLOCK_FRAMES = 64
+
+def log_mel_block(window, sr=44100, n_fft=MFCC_N_FFT, hop_length=MFCC_HOP_LENGTH):
+    """Log-mel frames (without the top_db floor) of a window that is already center-padded."""
+    mel = librosa.feature.melspectrogram(y=window, sr=sr, n_fft=n_fft, hop_length=hop_length, center=False)
+    return librosa.power_to_db(mel, top_db=None)
+
+def mfcc_from_log_mel(blocks, n_mfcc=13, top_db=MFCC_TOP_DB):
+    """Join consecutive log_mel_block outputs and finish them into the MFCC matrix."""
+    log_mel = np.concatenate(blocks, axis=1)
+    log_mel = np.maximum(log_mel, log_mel.max() - top_db)
+    return librosa.feature.mfcc(S=log_mel, n_mfcc=n_mfcc)
+
+def split_pcm_for_mfcc(audio_array, parts, n_fft=MFCC_N_FFT, hop_length=MFCC_HOP_LENGTH):
+    """
+    Split a signal into at most parts windows whose log_mel_block outputs,
+    joined in order, cover exactly the frames of compute_audio_features_from_pcm.
+    Neighbouring windows overlap by n_fft - hop_length samples.
+    """
+    padding = np.zeros(n_fft // 2, dtype=np.float32)
+    padded = np.concatenate([padding, np.asarray(audio_array, dtype=np.float32), padding])
+    frames = 1 + (len(padded) - n_fft) // hop_length
+    parts = max(1, min(parts, frames // MFCC_MIN_BLOCK_FRAMES))
+    bounds = np.linspace(0, frames, parts + 1).astype(int)
+    return [padded[start * hop_length:(end - 1) * hop_length + n_fft] for start, end in zip(bounds[:-1], bounds[1:])]
+
+class StreamingMFCC:
+    """
+    MFCCs computed from PCM delivered in chunks, equal to
+    compute_audio_features_from_pcm on the whole signal. Each block of
+    complete STFT windows is reduced to log-mel frames as soon as it arrives,
+    so neither the PCM nor the spectrogram of the whole track is ever held in
+    memory. power_to_db's 80 dB floor is relative to the loudest frame of the
+    whole track, so it and the final DCT are applied in result().
+    """
+    def __init__(self, sr=44100, n_fft=MFCC_N_FFT, hop_length=MFCC_HOP_LENGTH, n_mfcc=13, top_db=MFCC_TOP_DB, block_frames=256):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = n_mfcc
+        self.top_db = top_db
+        self.block_frames = block_frames
+        # Unconsumed PCM, joined only when a block is reduced. Starts with the
+        # zero padding that center=True adds before the first window.
+        self._chunks = [np.zeros(n_fft // 2, dtype=np.float32)]
+        self._pending = n_fft // 2
+        self._log_mel = []
+        self.samples = 0
+
+    def update(self, pcm):
+        self.samples += len(pcm)
+        self._chunks.append(pcm)
+        self._pending += len(pcm)
+        if self._pending >= self.n_fft + 2 * self.block_frames * self.hop_length:
+            self._consume()
+
+    def _consume(self, final=False):
+        if self._pending < self.n_fft:
+            return
+        buffer = np.concatenate(self._chunks)
+        frames = 1 + (len(buffer) - self.n_fft) // self.hop_length
+        if not final:
+            # Hold back a full block so the last block of the track is never narrow
+            frames -= self.block_frames
+        window = buffer[:(frames - 1) * self.hop_length + self.n_fft]
+        self._log_mel.append(log_mel_block(window, self.sr, self.n_fft, self.hop_length))
+        rest = buffer[frames * self.hop_length:].copy()
+        self._chunks = [rest]
+        self._pending = len(rest)
+
+    def result(self):
+        """The MFCC matrix (n_mfcc x windows), or None if no audio was received."""
+        if self.samples == 0:
+            return None
+        # Trailing center=True padding
+        self._chunks.append(np.zeros(self.n_fft // 2, dtype=np.float32))
+        self._pending += self.n_fft // 2
+        self._consume(final=True)
+        return mfcc_from_log_mel(self._log_mel, self.n_mfcc, self.top_db)
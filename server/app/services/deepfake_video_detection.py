@@ -1,18 +1,29 @@
-import tensorflow as tf
 import numpy as np
 import cv2
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import read_media
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 import io
 
 class DeepfakeVideoDetectionService:
     def __init__(self):
-        self.model = tf.keras.models.load_model("models/deepfake_videos.h5")
+        self.model = load_model_runner("deepfake_videos")
+        self.predictor = BatchingPredictor("deepfake_video", self.model.predict, concurrency=self.model.concurrency)
 
     def process_frame(self, frame):
-        frame = cv2.resize(frame, (224, 224))
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = tf.keras.applications.xception.preprocess_input(tf.convert_to_tensor(frame, dtype=tf.float32))
-        return np.expand_dims(frame, axis=0)
+        return self.process_frames([frame])
+
+    def process_frames(self, frames, bgr=True):
+        # Resize per frame, then run the Xception normalization over the stacked batch.
+        # OpenCV-decoded frames are BGR; frames decoded straight from the video are already RGB.
+        resized = [cv2.resize(frame, (224, 224)) for frame in frames]
+        if bgr:
+            resized = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in resized]
+        batch = np.stack(resized).astype(np.float32)
+        # Same in-place arithmetic as tf.keras.applications.xception.preprocess_input
+        batch /= 127.5
+        batch -= 1.0
+        return batch
 
     def calculate_weighted_average(self, predictions, threshold=0.5):
         weights = np.maximum(predictions - threshold, 0)
@@ -21,16 +32,21 @@ class DeepfakeVideoDetectionService:
         else:
             return np.average(predictions, weights=weights)
 
-    def detect_deepfake(self, frame_filenames):
-        predictions = []
-        for filename in frame_filenames:
-            frame_content = get_file_content(filename)
-            frame = cv2.imdecode(np.frombuffer(frame_content, np.uint8), cv2.IMREAD_COLOR)
-            processed_frame = self.process_frame(frame)
-            prediction = float(self.model.predict(processed_frame, verbose=0)[0][0])
-            predictions.append(prediction)
+    def detect_deepfake(self, frames):
+        decoded_frames = [
+            cv2.imdecode(np.frombuffer(read_media(frame_media), np.uint8), cv2.IMREAD_COLOR)
+            for frame_media in frames
+        ]
+        return self.classify_frames(self.process_frames(decoded_frames))
+
+    def detect_deepfake_arrays(self, frames):
+        """detect_deepfake for decoded RGB uint8 arrays, e.g. sampled video frames."""
+        return self.classify_frames(self.process_frames(frames, bgr=False))
+
+    def classify_frames(self, batch):
+        # One forward pass for every frame
+        predictions = self.predictor.predict_batch(batch)[:, 0].astype(np.float64)
 
-        predictions = np.array(predictions)
         weighted_avg_confidence = self.calculate_weighted_average(predictions)
         is_fake = weighted_avg_confidence > 0.5
 
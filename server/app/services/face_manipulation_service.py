@@ -3,9 +3,20 @@ import json
 from pathlib import Path
 from PIL import Image
 from transformers import ViTForImageClassification, ViTImageProcessor
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import read_media
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 import io
 import logging
+import numpy as np
+
+def load_face_manipulation_model(device):
+    model_config = json.loads(Path("models/deepfake_model_config.json").read_text())
+    model = ViTForImageClassification.from_pretrained("models/deepfake_model", num_labels=model_config["num_labels"])
+    model.load_state_dict(torch.load("models/deepfake_model.pth", map_location=device))
+    model.to(device)
+    model.eval()
+    return model
 
 class FaceManipulationService:
     def __init__(self):
@@ -13,15 +24,11 @@ class FaceManipulationService:
         self.device = torch.device('cpu')
         logging.info(f"Using device: {self.device}")
 
-        model_config = json.loads(Path("models/deepfake_model_config.json").read_text())
         self.image_params = json.loads(Path("models/deepfake_image_params.json").read_text())
         label_mappings = json.loads(Path("models/deepfake_label_mappings.json").read_text())
         logging.info("Configuration files loaded successfully")
 
-        self.model = ViTForImageClassification.from_pretrained("models/deepfake_model", num_labels=model_config["num_labels"])
-        self.model.load_state_dict(torch.load("models/deepfake_model.pth", map_location=self.device))
-        self.model.to(self.device)
-        self.model.eval()
+        self.model = load_model_runner("deepfake_model")
         logging.info("Face manipulation detection model loaded and set to evaluation mode")
 
         self.id2label = {int(k): v for k, v in label_mappings["id2label"].items()}
@@ -34,25 +41,30 @@ class FaceManipulationService:
         )
         logging.info("Image processor initialized")
 
-    def predict_image(self, firebase_filename):
+        self.predictor = BatchingPredictor("face_manipulation", self.predict_probabilities, concurrency=self.model.concurrency)
+
+    def predict_probabilities(self, pixel_values):
+        logits = self.model.predict(pixel_values)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_image(self, media):
         try:
-            logging.info(f"Predicting image manipulation for: {firebase_filename}")
-            image_content = get_file_content(firebase_filename)
+            logging.info(f"Predicting image manipulation for: {media}")
+            image_content = read_media(media)
             logging.info("Image content retrieved successfully")
             
             image = Image.open(io.BytesIO(image_content)).convert('RGB')
             logging.info(f"Image opened and converted to RGB. Size: {image.size}, Mode: {image.mode}")
             
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
+            inputs = self.processor(images=image, return_tensors="np")
             logging.info("Image processed and inputs prepared")
             
-            with torch.no_grad():
-                outputs = self.model(**inputs)
+            probs = self.predictor.predict_batch(inputs["pixel_values"])[0]
             logging.info("Model inference completed")
             
-            probs = outputs.logits.softmax(1)
-            pred_class = probs.argmax().item()
-            confidence = probs[0][pred_class].item()
+            pred_class = int(probs.argmax())
+            confidence = float(probs[pred_class])
             predicted_label = self.id2label[pred_class]
             logging.info(f"Prediction: Class {pred_class}, Label: {predicted_label}, Confidence: {confidence}")
             
@@ -63,9 +75,9 @@ class FaceManipulationService:
             logging.error(f"Image details - Size: {image.size if 'image' in locals() else 'N/A'}, Mode: {image.mode if 'image' in locals() else 'N/A'}")
             raise
 
-    def detect_manipulation(self, firebase_filename):
-        logging.info(f"Detecting face manipulation for: {firebase_filename}")
-        label, confidence = self.predict_image(firebase_filename)
+    def detect_manipulation(self, media):
+        logging.info(f"Detecting face manipulation for: {media}")
+        label, confidence = self.predict_image(media)
         is_deepfake = label == "Fake"
 
         result = {
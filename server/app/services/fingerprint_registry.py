@@ -0,0 +1,134 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.core.config import FINGERPRINT_REGISTRY_PATH
+from app.utils.hash_index import GrowableArray, HashIndex, parse_hashes, parse_hash, HASH_BITS
+
+# Registry hash kinds and the string format each one is stored in
+# (see app.utils.hash_index.parse_hashes).
+HASH_KINDS = {
+    "image_hash": "image",
+    "video_hash": "video",
+    "audio_hash": "video",
+}
+
+class FingerprintRegistry:
+    """
+    Persistent fingerprint store backed by SQLite, with one in-memory
+    HashIndex per hash kind for near-duplicate queries. Indexes are built
+    from the database on first use and kept in sync on every insert.
+    """
+    def __init__(self, path: str = FINGERPRINT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._indexes: Dict[str, HashIndex] = {}
+        self._row_ids: Dict[str, GrowableArray] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    hash_kind TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    content_id TEXT,
+                    source_url TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fingerprints_kind ON fingerprints (hash_kind)")
+            self._conn.commit()
+            logging.info(f"Fingerprint registry opened at {self.path}")
+        return self._conn
+
+    def _load_index(self, hash_kind: str):
+        # Caller holds self._lock
+        if hash_kind in self._indexes:
+            return
+        rows = self._connection().execute(
+            "SELECT id, hash FROM fingerprints WHERE hash_kind = ? ORDER BY id", (hash_kind,)
+        ).fetchall()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        positions, packed = parse_hashes([row[1] for row in rows], HASH_KINDS[hash_kind])
+        self._indexes[hash_kind] = HashIndex(packed)
+        self._row_ids[hash_kind] = GrowableArray(ids[positions], dtype=np.int64)
+        logging.info(f"Loaded {len(packed)} '{hash_kind}' fingerprints into the registry index")
+
+    def register(self, hash_kind: str, hash_value: str, content_id: Optional[str] = None,
+                 source_url: Optional[str] = None) -> int:
+        if hash_kind not in HASH_KINDS:
+            raise ValueError(f"Unknown hash kind '{hash_kind}'. Expected one of: {', '.join(HASH_KINDS)}")
+        packed = parse_hash(hash_value, HASH_KINDS[hash_kind])
+        if packed is None:
+            raise ValueError(f"Invalid {hash_kind}: {hash_value}")
+
+        with self._lock:
+            self._load_index(hash_kind)
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO fingerprints (hash_kind, hash, content_id, source_url, created_at) VALUES (?, ?, ?, ?, ?)",
+                (hash_kind, hash_value, content_id, source_url, time.time())
+            )
+            conn.commit()
+            row_id = cursor.lastrowid
+            self._indexes[hash_kind].add(packed)
+            self._row_ids[hash_kind].extend(row_id)
+        return row_id
+
+    def register_video_fingerprint(self, fingerprint: Dict[str, Any], content_id: Optional[str] = None,
+                                   source_url: Optional[str] = None) -> Dict[str, int]:
+        ids = {"video_hash": self.register("video_hash", fingerprint["video_hash"], content_id, source_url)}
+        if fingerprint.get("audio_hash"):
+            ids["audio_hash"] = self.register("audio_hash", fingerprint["audio_hash"], content_id, source_url)
+        return ids
+
+    def register_image_hash(self, image_hash: str, content_id: Optional[str] = None,
+                            source_url: Optional[str] = None) -> Dict[str, int]:
+        return {"image_hash": self.register("image_hash", image_hash, content_id, source_url)}
+
+    def query(self, hash_kind: str, hash_value: str, max_distance: int = 10,
+              top_k: Optional[int] = 10) -> List[Dict[str, Any]]:
+        if hash_kind not in HASH_KINDS:
+            raise ValueError(f"Unknown hash kind '{hash_kind}'. Expected one of: {', '.join(HASH_KINDS)}")
+        packed = parse_hash(hash_value, HASH_KINDS[hash_kind])
+        if packed is None:
+            raise ValueError(f"Invalid {hash_kind}: {hash_value}")
+
+        with self._lock:
+            self._load_index(hash_kind)
+            matches = self._indexes[hash_kind].search(packed, max_distance=max_distance, top_k=top_k)
+            row_ids = [int(self._row_ids[hash_kind].values[position]) for position, _ in matches]
+            distances = {row_id: distance for row_id, (_, distance) in zip(row_ids, matches)}
+            if not row_ids:
+                return []
+            placeholders = ",".join("?" * len(row_ids))
+            rows = self._connection().execute(
+                f"SELECT id, hash, content_id, source_url, created_at FROM fingerprints WHERE id IN ({placeholders})",
+                row_ids
+            ).fetchall()
+
+        rows_by_id = {row[0]: row for row in rows}
+        results = []
+        for row_id in row_ids:
+            _, stored_hash, content_id, source_url, created_at = rows_by_id[row_id]
+            distance = distances[row_id]
+            results.append({
+                "id": row_id,
+                "hash": stored_hash,
+                "content_id": content_id,
+                "source_url": source_url,
+                "created_at": created_at,
+                "hamming_distance": distance,
+                "similarity": 1 - (distance / float(HASH_BITS))
+            })
+        return results
+
+fingerprint_registry = FingerprintRegistry()
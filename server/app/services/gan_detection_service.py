@@ -1,30 +1,60 @@
 import numpy as np
-from tensorflow.keras.models import load_model
+from PIL import Image
 from tensorflow.keras.preprocessing import image
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import read_media
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 import io
 
 class GANDetectionService:
     def __init__(self):
-        self.model = load_model('models/gan_model.h5')
+        self.model = load_model_runner("gan_model")
+        self.predictor = BatchingPredictor("gan_detection", self.model.predict, concurrency=self.model.concurrency)
 
     def load_and_preprocess_image(self, image_content, target_size=(256, 256)):
-        img = image.load_img(io.BytesIO(image_content), target_size=target_size)
-        img_array = image.img_to_array(img)
-        img_array = img_array / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        return img_array
-
-    def detect_gan(self, firebase_filename):
-        image_content = get_file_content(firebase_filename)
-        img_array = self.load_and_preprocess_image(image_content)
-        prediction = self.model.predict(img_array)
-
-        real_confidence = float(prediction[0][0] * 100)
-        fake_confidence = float((1 - prediction[0][0]) * 100)
-
-        return {
-            "is_gan": fake_confidence > real_confidence,
-            "real_confidence": real_confidence,
-            "fake_confidence": fake_confidence
-        }
\ No newline at end of file
+        return self.preprocess_batch([image_content], target_size)
+
+    def preprocess_batch(self, image_contents, target_size=(256, 256)):
+        # Decode and resize each image, then normalize the stacked batch in one step
+        img_arrays = np.stack([
+            image.img_to_array(image.load_img(io.BytesIO(content), target_size=target_size))
+            for content in image_contents
+        ])
+        return img_arrays / 255.0
+
+    def preprocess_arrays(self, frames, target_size=(256, 256)):
+        # Nearest-neighbour resize, as load_img does for the file-based path
+        img_arrays = np.stack([
+            np.asarray(Image.fromarray(frame).resize((target_size[1], target_size[0]), Image.NEAREST), dtype=np.float32)
+            for frame in frames
+        ])
+        return img_arrays / 255.0
+
+    def detect_gan(self, media):
+        return self.detect_gan_batch([media])[0]
+
+    def detect_gan_batch(self, medias):
+        """Run GAN detection on several images with a single forward pass."""
+        if not medias:
+            return []
+        return self.classify_batch(self.preprocess_batch([read_media(media) for media in medias]))
+
+    def detect_gan_arrays(self, frames):
+        """GAN detection for decoded RGB uint8 arrays, e.g. sampled video frames."""
+        if not frames:
+            return []
+        return self.classify_batch(self.preprocess_arrays(frames))
+
+    def classify_batch(self, img_arrays):
+        predictions = self.predictor.predict_batch(img_arrays)
+
+        results = []
+        for prediction in predictions:
+            real_confidence = float(prediction[0] * 100)
+            fake_confidence = float((1 - prediction[0]) * 100)
+            results.append({
+                "is_gan": fake_confidence > real_confidence,
+                "real_confidence": real_confidence,
+                "fake_confidence": fake_confidence
+            })
+        return results
\ No newline at end of file
@@ -1,6 +1,8 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import imagehash
+import numpy as np
+from app.utils.hash_index import HashIndex, parse_hashes, parse_hash, HASH_BITS
 
 def identify_hash_type(hash_value: str) -> str:
     # Image hashes are typically 64 characters long and contain only 0 and 1
@@ -46,10 +48,27 @@ def compare_video_hashes(hash1: str, hash2: str) -> Dict[str, Any]:
         "hamming_distance": distance
     }
 
-def compare_hash_with_array(hash_to_compare: str, hash_array: List[str], file_type: str) -> Dict[str, Any]:
-    results = []
-    matching_hash = ""
+SIMILARITY_THRESHOLD = 0.8
 
+def _comparison_result(hash1: str, hash2: str, distance: int) -> Dict[str, Any]:
+    similarity = 1 - (distance / float(HASH_BITS))
+    return {
+        "hash1": hash1,
+        "hash2": hash2,
+        "are_similar": similarity > SIMILARITY_THRESHOLD,
+        "similarity": similarity,
+        "hamming_distance": distance
+    }
+
+def compare_hash_with_array(hash_to_compare: str, hash_array: List[str], file_type: str,
+                            max_distance: Optional[int] = None, top_k: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare a hash against an array of hashes of the same type. Without
+    max_distance/top_k this keeps the original contract: comparisons are
+    reported in array order up to and including the first similar hash.
+    With either option set, the array is searched as an index and all
+    matches within max_distance (best first, at most top_k) are returned.
+    """
     if not hash_array:
         return {
             "results": [],
@@ -57,23 +76,37 @@ def compare_hash_with_array(hash_to_compare: str, hash_array: List[str], file_ty
             "message": "The provided hash array is empty."
         }
 
-    for hash_value in hash_array:
-        hash_type = identify_hash_type(hash_value)
-        if hash_type == file_type:
-            comparison_result = compare_hashes(hash_to_compare, hash_value, file_type)
-            results.append(comparison_result)
-            
-            if comparison_result['are_similar']:
-                matching_hash = hash_value
-                break  # Stop after finding the first similar hash
-
-    if not results:
+    positions, packed = parse_hashes(hash_array, file_type)
+    if len(positions) == 0:
         return {
             "results": [],
             "matching_hash": "",
             "message": f"No hashes of type '{file_type}' found in the provided array."
         }
 
+    query = parse_hash(hash_to_compare, file_type)
+    if query is None:
+        raise ValueError(f"hash_to_compare is not a valid '{file_type}' hash")
+
+    index = HashIndex(packed)
+    if max_distance is not None or top_k is not None:
+        matches = index.search(query, max_distance=max_distance, top_k=top_k)
+        results = []
+        for position, distance in matches:
+            result = _comparison_result(hash_to_compare, hash_array[positions[position]], distance)
+            result["index"] = int(positions[position])
+            results.append(result)
+        matching_hash = results[0]["hash2"] if results and results[0]["are_similar"] else ""
+    else:
+        distances = index.distances(query)
+        similar = np.nonzero(1 - distances / float(HASH_BITS) > SIMILARITY_THRESHOLD)[0]
+        stop = int(similar[0]) + 1 if len(similar) else len(distances)
+        results = [
+            _comparison_result(hash_to_compare, hash_array[positions[i]], int(distances[i]))
+            for i in range(stop)
+        ]
+        matching_hash = hash_array[positions[similar[0]]] if len(similar) else ""
+
     if matching_hash:
         message = "Hash comparison completed successfully. A matching hash was found."
     else:
@@ -83,4 +116,4 @@ def compare_hash_with_array(hash_to_compare: str, hash_array: List[str], file_ty
         "results": results,
         "matching_hash": matching_hash,
         "message": message
-    }
\ No newline at end of file
+    }
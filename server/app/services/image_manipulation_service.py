@@ -1,13 +1,15 @@
-import tensorflow as tf
 import numpy as np
 from PIL import Image, ImageChops, ImageEnhance
 import json
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import read_media
+from app.core.inference_scheduler import BatchingPredictor
+from app.core.model_backend import load_model_runner
 import io
 
 class ImageManipulationService:
     def __init__(self):
-        self.model = tf.keras.models.load_model('models/image_manipulation_detection_model.h5')
+        self.model = load_model_runner("image_manipulation_detection_model")
+        self.predictor = BatchingPredictor("image_manipulation", self.model.predict, concurrency=self.model.concurrency)
 
         with open('models/img_manipulation_class_names.json', 'r') as f:
             self.class_names = json.load(f)
@@ -36,27 +38,81 @@ class ImageManipulationService:
 
         return ela_image
 
+    def convert_to_ela_arrays(self, images, quality):
+        """
+        Vectorized equivalent of convert_to_ela_image for same-sized RGB
+        images: only the JPEG round trip runs per image, the difference and
+        brightness scaling run over the stacked batch.
+        """
+        recompressed = []
+        for image in images:
+            temp_buffer = io.BytesIO()
+            image.save(temp_buffer, 'JPEG', quality=quality)
+            temp_buffer.seek(0)
+            recompressed.append(np.asarray(Image.open(temp_buffer).convert('RGB'), dtype=np.int16))
+
+        originals = np.stack([np.asarray(image, dtype=np.int16) for image in images])
+        diff = np.abs(originals - np.stack(recompressed))
+
+        max_diff = diff.reshape(len(diff), -1).max(axis=1)
+        max_diff[max_diff == 0] = 1
+        # Same float32 scaling and truncation as ImageEnhance.Brightness
+        scale = (255.0 / max_diff).astype(np.float32)
+        ela = diff.astype(np.float32) * scale[:, None, None, None]
+        return np.clip(ela, 0, 255).astype(np.uint8)
+
     def prepare_image(self, image_content):
-        image = Image.open(io.BytesIO(image_content))
-        ela_image = self.convert_to_ela_image(image, quality=90)
-        ela_image = ela_image.resize((128, 128))
-        return np.array(ela_image).flatten() / 255.0
-
-    def detect_manipulation(self, firebase_filename):
-        image_content = get_file_content(firebase_filename)
-        prepared_image = self.prepare_image(image_content)
-        prepared_image = prepared_image.reshape(-1, 128, 128, 3)
-
-        prediction = self.model.predict(prepared_image)
-        predicted_class = int(np.argmax(prediction, axis=1)[0])
-        confidence = float(np.max(prediction) * 100)
-        
-        check_manipulated = bool(predicted_class == 0 and confidence > 90)
+        return self.prepare_batch([image_content])[0].flatten()
+
+    def prepare_batch(self, image_contents):
+        images = []
+        for content in image_contents:
+            image = Image.open(io.BytesIO(content))
+            images.append(image if image.mode == 'RGB' else image.convert('RGB'))
+        return self.prepare_images(images)
+
+    def prepare_images(self, images):
+        # Video frames share one size, so this is normally a single group
+        ela_images = [None] * len(images)
+        groups = {}
+        for index, image in enumerate(images):
+            groups.setdefault(image.size, []).append(index)
+        for indices in groups.values():
+            ela_arrays = self.convert_to_ela_arrays([images[i] for i in indices], quality=90)
+            for index, ela_array in zip(indices, ela_arrays):
+                ela_images[index] = np.asarray(Image.fromarray(ela_array).resize((128, 128)))
+
+        return np.stack(ela_images) / 255.0
+
+    def detect_manipulation(self, media):
+        return self.detect_manipulation_batch([media])[0]
+
+    def detect_manipulation_batch(self, medias):
+        """Run manipulation detection on several images with a single forward pass."""
+        if not medias:
+            return []
+        return self.classify_batch(self.prepare_batch([read_media(media) for media in medias]))
+
+    def detect_manipulation_arrays(self, frames):
+        """Manipulation detection for decoded RGB uint8 arrays, e.g. sampled video frames."""
+        if not frames:
+            return []
+        return self.classify_batch(self.prepare_images([Image.fromarray(frame) for frame in frames]))
+
+    def classify_batch(self, prepared_images):
+        predictions = self.predictor.predict_batch(prepared_images)
+        predicted_classes = np.argmax(predictions, axis=1)
+        confidences = np.max(predictions, axis=1) * 100
 
-        result = {
-            "class": self.class_names[predicted_class],
-            "confidence": f"{confidence:.2f}%",
-            "is_manipulated": check_manipulated
-        }
+        results = []
+        for predicted_class, confidence in zip(predicted_classes, confidences):
+            predicted_class = int(predicted_class)
+            confidence = float(confidence)
+            check_manipulated = bool(predicted_class == 0 and confidence > 90)
+            results.append({
+                "class": self.class_names[predicted_class],
+                "confidence": f"{confidence:.2f}%",
+                "is_manipulated": check_manipulated
+            })
 
-        return result
\ No newline at end of file
+        return results
\ No newline at end of file
@@ -1,15 +1,28 @@
 from app.utils.image_utils import process_image, compare_images as compare_images_util
 from fastapi import HTTPException
 import logging
-from app.utils.file_utils import download_file, remove_temp_file
+from app.utils.file_utils import download_file, download_media, remove_temp_file, MediaHandle, FileTooLargeError
+from app.core.result_cache import result_cache
 
 async def verify_image(image_url: str):
     firebase_filename = None
     try:
-        firebase_filename = await download_file(image_url)
-        
-        image_hash = process_image(firebase_filename)
-        return {"image_hash": image_hash}
+        media = await download_media(image_url)
+        firebase_filename = media.filename
+
+        cache_key = result_cache.make_key("verify_image", media.digest)
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Returning cached image hash for: {image_url}")
+            return cached_result
+
+        await media.load()
+        image_hash = process_image(media)
+        result = {"image_hash": image_hash}
+        result_cache.set(cache_key, result)
+        return result
+    except FileTooLargeError:
+        raise
     except Exception as e:
         logging.error(f"Error verifying image: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error verifying image: {str(e)}")
@@ -26,10 +39,14 @@ async def compare_images(image_url1: str, image_url2: str):
         firebase_filename2 = await download_file(image_url2)
         
         # Compare the images using the utility function
-        comparison_result = compare_images_util(firebase_filename1, firebase_filename2)
+        media1 = await MediaHandle(firebase_filename1).load()
+        media2 = await MediaHandle(firebase_filename2).load()
+        comparison_result = compare_images_util(media1, media2)
         
         # Return the comparison result
         return comparison_result
+    except FileTooLargeError:
+        raise
     except Exception as e:
         logging.error(f"Error comparing images: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error comparing images: {str(e)}")
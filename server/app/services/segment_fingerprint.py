@@ -0,0 +1,158 @@
+import os
+import atexit
+import logging
+import tempfile
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Optional, Tuple, Union
+import av
+import numpy as np
+from app.core.config import FINGERPRINT_WORKERS, FINGERPRINT_PARALLEL_MIN_SECONDS, FINGERPRINT_SEGMENT_SECONDS
+from app.core.cpu_budget import available_cpus, configure_video_decoder, limit_video_decode_threads
+from app.utils.frame_sampling import keyframe_timestamps, stream_duration
+from app.utils.media_decoder import (
+    decode_media, DecodedVideoFrame, DCTFeatureExtractor, AverageHashExtractor, PCMExtractor
+)
+
+# A segment is the half-open pts range [start, end) of the video stream; None
+# means the start or end of the stream.
+Segment = Tuple[Optional[int], Optional[int]]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _init_worker(workers: int):
+    # The cores are shared between the pool's processes
+    limit_video_decode_threads(max(1, available_cpus() // workers))
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the API process may hold TensorFlow / PyTorch state
+            _pool = ProcessPoolExecutor(
+                max_workers=FINGERPRINT_WORKERS, mp_context=mp.get_context("spawn"),
+                initializer=_init_worker, initargs=(FINGERPRINT_WORKERS,)
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+def video_duration(source: Union[str, BinaryIO]) -> float:
+    """Duration of the video stream in seconds (0 without one); source is a path or file object."""
+    with av.open(source) as container:
+        if not container.streams.video:
+            return 0.0
+        return stream_duration(container, container.streams.video[0])
+
+def should_fingerprint_in_segments(duration: float) -> bool:
+    return FINGERPRINT_WORKERS > 0 and duration >= FINGERPRINT_PARALLEL_MIN_SECONDS
+
+def plan_segments(path: str, segment_seconds: float) -> List[Segment]:
+    """
+    Split the video stream at keyframes into segments of at least
+    segment_seconds (the last one may be shorter). Only packets are read;
+    nothing is decoded.
+    """
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        time_base = float(stream.time_base)
+        keyframes = keyframe_timestamps(container, stream)
+
+    boundaries = []
+    segment_start = keyframes[0] if keyframes else None
+    for pts in keyframes[1:]:
+        if (pts - segment_start) * time_base >= segment_seconds:
+            boundaries.append(pts)
+            segment_start = pts
+    starts = [None] + boundaries
+    ends = boundaries + [None]
+    return list(zip(starts, ends))
+
+def fingerprint_segment(path: str, segment: Segment) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Frame hashes (packed) and DCT features of the frames whose pts fall in
+    the segment. Runs in a pool worker. Decoding starts at the segment's
+    keyframe; open-GOP frames that precede it in display order belong to the
+    previous segment, whose worker decodes past its end until they are out.
+    Frames without a pts cannot be placed in a segment and are skipped, as
+    every worker that decodes them would otherwise count them.
+    """
+    start, end = segment
+    dct_extractor = DCTFeatureExtractor()
+    frame_hash_extractor = AverageHashExtractor()
+    index = 0
+    with av.open(path) as container:
+        stream = configure_video_decoder(container.streams.video[0])
+        if start is not None:
+            container.seek(start, stream=stream, backward=True)
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            if start is not None and frame.pts < start:
+                continue
+            if end is not None and frame.pts >= end:
+                break
+            decoded = DecodedVideoFrame(frame, index)
+            dct_extractor.on_video_frame(decoded)
+            frame_hash_extractor.on_video_frame(decoded)
+            index += 1
+    return frame_hash_extractor.packed(), dct_extractor.result()
+
+def log_mel_block(window: np.ndarray) -> np.ndarray:
+    # Imported here so workers that only decode video do not load librosa
+    from app.services import audio_service
+    return audio_service.log_mel_block(window)
+
+class SegmentedFingerprint:
+    def __init__(self, packed_hashes: np.ndarray, features: np.ndarray, mfcc: Optional[np.ndarray],
+                 has_audio: bool, segments: int):
+        self.packed_hashes = packed_hashes
+        self.features = features
+        self.mfcc = mfcc
+        self.has_audio = has_audio
+        self.segments = segments
+
+def fingerprint_in_segments(path: str, duration: float) -> SegmentedFingerprint:
+    """
+    Fingerprint a video file with the work spread over the process pool. The
+    video stream is decoded segment by segment in the workers while this
+    thread decodes the audio track; the MFCC windows are then computed in
+    blocks in the workers. Per-frame results are concatenated in segment
+    order and the MFCC blocks in time order, so the result equals a
+    sequential decode_media pass over the same file whenever every frame has
+    a pts.
+    """
+    from app.services import audio_service
+
+    pool = get_pool()
+    segment_seconds = min(FINGERPRINT_SEGMENT_SECONDS, duration / FINGERPRINT_WORKERS)
+    segments = plan_segments(path, segment_seconds)
+    logging.info(f"Fingerprinting {duration:.1f}s video in {len(segments)} segment(s) on {FINGERPRINT_WORKERS} worker(s)")
+    video_jobs = [pool.submit(fingerprint_segment, path, segment) for segment in segments]
+    try:
+        pcm_extractor = PCMExtractor()
+        probe = decode_media(path, audio_extractors=[pcm_extractor])
+        audio_array = pcm_extractor.result()
+        mfcc = None
+        if probe.has_audio and audio_array.size > 0:
+            windows = audio_service.split_pcm_for_mfcc(audio_array, len(segments))
+            del audio_array
+            mfcc = audio_service.mfcc_from_log_mel(list(pool.map(log_mel_block, windows)))
+
+        results = [job.result() for job in video_jobs]
+    finally:
+        for job in video_jobs:
+            job.cancel()
+
+    packed_hashes = np.concatenate([packed for packed, _ in results])
+    features = [features for _, features in results if len(features)]
+    features = np.concatenate(features) if features else np.zeros((0, 64))
+    return SegmentedFingerprint(packed_hashes, features, mfcc, probe.has_audio, len(segments))
+
+def spool_to_file(video_content: bytes) -> str:
+    """Write the video to a temp file the workers can open by path; the caller deletes it."""
+    handle, path = tempfile.mkstemp(suffix=".video")
+    with os.fdopen(handle, "wb") as f:
+        f.write(video_content)
+    return path
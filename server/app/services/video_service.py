@@ -1,89 +1,196 @@
-import numpy as np
-from scipy.fftpack import dct
 import imagehash
-from PIL import Image
 import logging
 import io
-import av
-from app.utils.hash_utils import compute_video_hash, compute_frame_hashes
-from app.services.audio_service import extract_audio_features, compute_audio_hash, compute_audio_hashes
-from app.utils.file_utils import download_file, remove_temp_file, get_file_content
-from app.core.firebase_config import firebase_bucket
+import os
+import asyncio
+import hashlib
+from fastapi.concurrency import run_in_threadpool
+from app.utils.hash_utils import compute_video_hash, video_hash_from_mean
+from app.utils.perceptual_hash import to_hex
+from app.services import segment_fingerprint
+from app.utils.media_decoder import decode_media, DCTFeatureExtractor, AverageHashExtractor, PCMExtractor
+from app.services.audio_service import compute_audio_fingerprint, compute_audio_fingerprint_from_mfcc, StreamingMFCC
+from app.utils.file_utils import download_media, remove_temp_file, ProgressiveFile, stream_to_progressive_file
+from app.core.http_client import get_http_session
+from app.core.result_cache import result_cache
+from app.core.config import FINGERPRINT_STREAMING, FINGERPRINT_WORKERS
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def validate_video_bytes(video_bytes):
-    try:
-        with av.open(io.BytesIO(video_bytes)) as container:
-            has_video = any(stream.type == 'video' for stream in container.streams)
-            has_audio = any(stream.type == 'audio' for stream in container.streams)
-            
-            if not has_video:
-                raise ValueError("No video stream found in the file")
-            
-            if not has_audio:
-                logger.warning("No audio stream found in the file")
-            
-            return has_audio
-    except Exception as e:
-        logger.error(f"Error validating video bytes: {str(e)}")
-        return False
-
 async def extract_video_features(video_content):
     logging.info("Extracting video features")
     
     try:
-        with av.open(io.BytesIO(video_content)) as container:
-            video_stream = next(s for s in container.streams if s.type == 'video')
-            features = []
-            
-            for frame in container.decode(video=0):
-                img = frame.to_image().convert('L')  # Convert to grayscale
-                resized = np.array(img.resize((32, 32)))
-                dct_frame = dct(dct(resized.T, norm='ortho').T, norm='ortho')
-                features.append(dct_frame[:8, :8].flatten())
+        extractor = DCTFeatureExtractor()
+        decode_media(video_content, video_extractors=[extractor])
         
     except Exception as e:
         logger.error(f"Error extracting video features: {str(e)}")
         raise
     
     logging.info("Finished extracting video features.")
-    return np.array(features)
+    return extractor.result()
 
 async def fingerprint_video(video_url):
+    if FINGERPRINT_STREAMING:
+        return await fingerprint_video_streaming(video_url)
+
     logging.info(f"Fingerprinting video: {video_url}")
     firebase_filename = None
     try:
-        firebase_filename = await download_file(video_url)
-        video_content = get_file_content(firebase_filename)
-        
-        video_features = await extract_video_features(video_content)
+        media = await download_media(video_url)
+        firebase_filename = media.filename
+
+        cache_key = result_cache.make_key("fingerprint", media.digest)
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Returning cached fingerprint for: {video_url}")
+            return cached_result
+
+        video_content = (await media.load()).content
+
+        if FINGERPRINT_WORKERS > 0:
+            result = await _fingerprint_in_segments(video_content)
+            if result is not None:
+                result_cache.set(cache_key, result)
+                return result
+
+        # Decode the container once and feed every frame and audio chunk to
+        # all feature extractors.
+        dct_extractor = DCTFeatureExtractor()
+        frame_hash_extractor = AverageHashExtractor()
+        pcm_extractor = PCMExtractor()
+        probe = decode_media(video_content, [dct_extractor, frame_hash_extractor], [pcm_extractor])
+        if not probe.has_video:
+            raise ValueError("No video stream found in the file")
+        video_features = dct_extractor.result()
+        audio_array = pcm_extractor.result()
         
-        if validate_video_bytes(video_content):
-            audio_features = extract_audio_features(video_content)
-            audio_hashes = compute_audio_hashes(video_content)
-            collective_audio_hash = compute_audio_hash(audio_features)
+        if probe.has_audio and audio_array.size > 0:
+            # One MFCC matrix feeds both the collective and per-window hashes.
+            collective_audio_hash, audio_hashes = compute_audio_fingerprint(audio_array)
         else:
             logging.warning("No audio stream found or invalid video. Skipping audio feature extraction.")
             audio_hashes = []
             collective_audio_hash = None
         
         video_hash = compute_video_hash(video_features)
-        frame_hashes = compute_frame_hashes(video_content)
+        frame_hashes = frame_hash_extractor.result()
 
         logging.info("Finished fingerprinting video.")
 
-        return {
-            'frame_hashes': frame_hashes,
-            'audio_hashes': audio_hashes,
-            'audio_hash': str(collective_audio_hash) if collective_audio_hash else None,
-            'video_hash': str(video_hash),
-        }
+        result = _fingerprint_result(frame_hashes, audio_hashes, collective_audio_hash, video_hash)
+        result_cache.set(cache_key, result)
+        return result
     finally:
         if firebase_filename:
             await remove_temp_file(firebase_filename)
 
+async def _fingerprint_in_segments(video_content):
+    """
+    Segment-parallel fingerprint of a long video, or None when the video is
+    shorter than FINGERPRINT_PARALLEL_MIN_SECONDS.
+    """
+    # Probed from memory so short videos are never written to disk
+    duration = await run_in_threadpool(segment_fingerprint.video_duration, io.BytesIO(video_content))
+    if not segment_fingerprint.should_fingerprint_in_segments(duration):
+        return None
+    path = await run_in_threadpool(segment_fingerprint.spool_to_file, video_content)
+    try:
+        fingerprint = await run_in_threadpool(segment_fingerprint.fingerprint_in_segments, path, duration)
+    finally:
+        os.remove(path)
+
+    if len(fingerprint.features) == 0:
+        raise ValueError("No video stream found in the file")
+    if fingerprint.mfcc is not None:
+        collective_audio_hash, audio_hashes = compute_audio_fingerprint_from_mfcc(fingerprint.mfcc)
+    else:
+        logging.warning("No audio stream found or invalid video. Skipping audio feature extraction.")
+        audio_hashes = []
+        collective_audio_hash = None
+
+    logging.info(f"Finished fingerprinting video in {fingerprint.segments} segment(s).")
+    return _fingerprint_result(to_hex(fingerprint.packed_hashes), audio_hashes, collective_audio_hash,
+                               compute_video_hash(fingerprint.features))
+
+def _fingerprint_result(frame_hashes, audio_hashes, collective_audio_hash, video_hash):
+    return {
+        'frame_hashes': frame_hashes,
+        'audio_hashes': audio_hashes,
+        'audio_hash': str(collective_audio_hash) if collective_audio_hash else None,
+        'video_hash': str(video_hash),
+    }
+
+async def fingerprint_video_streaming(video_url):
+    """
+    Fingerprint a video while it downloads, without passing it through
+    storage. The response body goes into a ProgressiveFile that the decoder
+    reads from in a worker thread, so for MP4s with the index at the front
+    decoding overlaps the download. Frame hashes, the DCT feature sum and the
+    MFCC windows are updated as frames are decoded; only the per-frame and
+    per-window hashes grow with the video length.
+    """
+    logging.info(f"Fingerprinting video (streaming): {video_url}")
+    source = ProgressiveFile()
+    hasher = hashlib.sha256()
+
+    async def download():
+        try:
+            async with get_http_session().get(video_url) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to download file: HTTP {response.status}")
+                await stream_to_progressive_file(response, source, hasher=hasher)
+        except BaseException as e:
+            source.fail(e)
+            raise
+
+    dct_extractor = DCTFeatureExtractor(keep_features=False)
+    frame_hash_extractor = AverageHashExtractor()
+    mfcc = StreamingMFCC()
+    pcm_extractor = PCMExtractor(on_chunk=mfcc.update)
+    download_task = asyncio.ensure_future(download())
+    try:
+        try:
+            probe = await run_in_threadpool(decode_media, source, [dct_extractor, frame_hash_extractor], [pcm_extractor])
+        except Exception:
+            # A failed download surfaces as a read error in the decoder; report the download's own error
+            if source.failed:
+                await asyncio.wait([download_task])
+                if not download_task.cancelled() and download_task.exception() is not None:
+                    raise download_task.exception()
+            raise
+        await download_task
+    finally:
+        if not download_task.done():
+            download_task.cancel()
+            await asyncio.gather(download_task, return_exceptions=True)
+        source.close()
+
+    cache_key = result_cache.make_key("fingerprint", hasher.hexdigest())
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        logging.info(f"Returning cached fingerprint for: {video_url}")
+        return cached_result
+
+    mean_features = dct_extractor.mean()
+    if not probe.has_video or mean_features is None:
+        raise ValueError("No video stream found in the file")
+
+    if probe.has_audio and mfcc.samples > 0:
+        collective_audio_hash, audio_hashes = compute_audio_fingerprint_from_mfcc(mfcc.result())
+    else:
+        logging.warning("No audio stream found or invalid video. Skipping audio feature extraction.")
+        audio_hashes = []
+        collective_audio_hash = None
+
+    logging.info("Finished fingerprinting video.")
+    result = _fingerprint_result(frame_hash_extractor.result(), audio_hashes, collective_audio_hash,
+                                 video_hash_from_mean(mean_features))
+    result_cache.set(cache_key, result)
+    return result
+
 async def compare_videos(video_url1, video_url2):
     fp1 = await fingerprint_video(video_url1)
     fp2 = await fingerprint_video(video_url2)
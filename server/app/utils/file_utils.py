@@ -1,11 +1,168 @@
 import aiohttp
 import uuid 
+import hashlib
 import logging
+import tempfile
+import threading
 from urllib.parse import urlparse
-from app.core.firebase_config import firebase_bucket
+from app.core.storage import get_storage, run_storage_io
+from app.core.http_client import get_http_session
+from app.core.config import MAX_DOWNLOAD_BYTES, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_SPOOL_MAX_MEMORY
+from typing import Optional, Union
 import io
 
-async def download_file(url: str) -> str:
+class FileTooLargeError(ValueError):
+    """Raised when a remote file exceeds MAX_DOWNLOAD_BYTES."""
+
+def _too_large_message(size: int) -> str:
+    return f"File exceeds the maximum allowed size of {MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB ({size} bytes)"
+
+async def stream_to_spooled_file(response: aiohttp.ClientResponse, max_bytes: int = MAX_DOWNLOAD_BYTES, hasher=None) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy a response body into a SpooledTemporaryFile chunk by chunk. Small
+    files stay in memory; larger ones roll over to disk, so peak memory stays
+    bounded by DOWNLOAD_SPOOL_MAX_MEMORY regardless of the file size. If a
+    hashlib object is given it is updated with every chunk.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in _iter_response_chunks(response, max_bytes):
+            spooled.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        spooled.seek(0)
+        return spooled
+    except BaseException:
+        spooled.close()
+        raise
+
+async def _iter_response_chunks(response: aiohttp.ClientResponse, max_bytes: int):
+    content_length = response.content_length
+    if content_length is not None and content_length > max_bytes:
+        raise FileTooLargeError(_too_large_message(content_length))
+
+    received = 0
+    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            raise FileTooLargeError(_too_large_message(received))
+        yield chunk
+
+class ProgressiveFile(io.RawIOBase):
+    """
+    Seekable, read-only view of a download that is still arriving. The
+    download appends chunks; a reader in another thread (such as a PyAV
+    demuxer) blocks until the bytes it asks for have arrived, so decoding can
+    start on the head of the file while the rest is in flight. Seeking
+    relative to the end uses the expected size when the server sent one and
+    otherwise waits for the whole file. The bytes are kept in a
+    SpooledTemporaryFile, so memory stays bounded by DOWNLOAD_SPOOL_MAX_MEMORY.
+    Closing wakes blocked readers, which then fail like reads on any closed
+    file; chunks that arrive after close are dropped.
+    """
+    def __init__(self):
+        super().__init__()
+        self._spooled = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_MEMORY)
+        self._condition = threading.Condition()
+        self._size = 0
+        self.expected_size = None
+        self._position = 0
+        self._complete = False
+        self._error = None
+        self._released = False
+
+    # Writer side
+    def append(self, chunk: bytes):
+        with self._condition:
+            if self._released:
+                return
+            self._spooled.seek(0, io.SEEK_END)
+            self._spooled.write(chunk)
+            self._size += len(chunk)
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self._complete = True
+            self._condition.notify_all()
+
+    def fail(self, error: BaseException):
+        """Make blocked and future reads raise error, e.g. when the download is aborted."""
+        with self._condition:
+            self._error = error
+            self._condition.notify_all()
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    # Reader side
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _check_open(self):
+        if self._released:
+            raise ValueError("I/O operation on closed file.")
+
+    def _wait_for(self, predicate):
+        self._check_open()
+        self._condition.wait_for(lambda: self._released or self._error is not None or self._complete or predicate())
+        self._check_open()
+        if self._error is not None:
+            raise IOError(f"Download failed: {self._error}") from self._error
+
+    def readinto(self, buffer) -> int:
+        with self._condition:
+            wanted = len(buffer)
+            self._wait_for(lambda: self._size >= self._position + wanted)
+            self._spooled.seek(self._position)
+            count = self._spooled.readinto(memoryview(buffer)[:max(0, min(wanted, self._size - self._position))])
+            self._position += count
+            return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        with self._condition:
+            self._check_open()
+            if whence == io.SEEK_END:
+                if self.expected_size is None or self._complete:
+                    self._wait_for(lambda: False)
+                    self._position = self._size + offset
+                else:
+                    self._position = self.expected_size + offset
+            elif whence == io.SEEK_CUR:
+                self._position += offset
+            else:
+                self._position = offset
+            return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        with self._condition:
+            self._released = True
+            self._spooled.close()
+            self._condition.notify_all()
+        super().close()
+
+async def stream_to_progressive_file(response: aiohttp.ClientResponse, target: ProgressiveFile,
+                                     max_bytes: int = MAX_DOWNLOAD_BYTES, hasher=None):
+    """Append a response body to a ProgressiveFile as it arrives; failures are passed on to its readers."""
+    target.expected_size = response.content_length
+    try:
+        async for chunk in _iter_response_chunks(response, max_bytes):
+            target.append(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        target.finish()
+    except BaseException as e:
+        target.fail(e)
+        raise
+
+async def _download_to_storage(url: str):
     parsed_url = urlparse(url)
     file_extension = parsed_url.path.split('.')[-1]
     
@@ -13,54 +170,108 @@ async def download_file(url: str) -> str:
         file_extension = 'tmp'
 
     filename = f"{uuid.uuid4()}.{file_extension}"
+    hasher = hashlib.sha256()
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to download file: HTTP {response.status}")
-                
-                content = await response.read()
-                blob = firebase_bucket.blob(filename)
-                blob.upload_from_string(content, content_type=response.headers.get('content-type'))
-
-        logging.info(f"File downloaded and saved to Firebase: {filename}")
-        return filename
+        async with get_http_session().get(url) as response:
+            if response.status != 200:
+                raise Exception(f"Failed to download file: HTTP {response.status}")
+            
+            with await stream_to_spooled_file(response, hasher=hasher) as spooled:
+                storage = get_storage()
+                await run_storage_io(storage.upload_file, filename, spooled, content_type=response.headers.get('content-type'))
+
+        logging.info(f"File downloaded and saved to {storage.name} storage: {filename}")
+        return filename, hasher.hexdigest()
     except Exception as e:
         logging.error(f"Error downloading file: {str(e)}")
         raise
 
-async def remove_temp_file(filename: str):
+async def download_file(url: str) -> str:
+    filename, _ = await _download_to_storage(url)
+    return filename
+
+async def download_media(url: str) -> "MediaHandle":
+    """Download a file to storage and return a handle carrying its SHA-256 digest."""
+    filename, digest = await _download_to_storage(url)
+    return MediaHandle(filename, digest=digest)
+
+async def remove_temp_file(filename: str, scratch: bool = False):
+    try:
+        await run_storage_io(get_storage(scratch).delete, filename)
+        logging.info(f"Temporary file deleted from storage: {filename}")
+    except Exception as e:
+        logging.error(f"Error deleting temporary file from storage: {str(e)}")
+
+def get_file_content(filename: str, scratch: bool = False) -> bytes:
     try:
-        blob = firebase_bucket.blob(filename)
-        blob.delete()
-        logging.info(f"Temporary file deleted from Firebase: {filename}")
+        return get_storage(scratch).download(filename)
     except Exception as e:
-        logging.error(f"Error deleting temporary file from Firebase: {str(e)}")
+        logging.error(f"Error getting file content from storage: {str(e)}")
+        raise
 
-def get_file_content(filename: str) -> bytes:
+async def fetch_file_content(filename: str, scratch: bool = False) -> bytes:
+    """Non-blocking variant of get_file_content for use inside async handlers."""
     try:
-        blob = firebase_bucket.blob(filename)
-        return blob.download_as_bytes()
+        return await run_storage_io(get_storage(scratch).download, filename)
     except Exception as e:
-        logging.error(f"Error getting file content from Firebase: {str(e)}")
+        logging.error(f"Error getting file content from storage: {str(e)}")
         raise
 
-def get_file_stream(filename: str) -> io.BytesIO:
+def get_file_stream(filename: str, scratch: bool = False) -> io.BytesIO:
     try:
-        content = get_file_content(filename)
+        content = get_file_content(filename, scratch)
         return io.BytesIO(content)
     except Exception as e:
-        logging.error(f"Error getting file stream from Firebase: {str(e)}")
+        logging.error(f"Error getting file stream from storage: {str(e)}")
         raise
     
 
-async def upload_file_to_firebase(file_content: bytes, filename: str) -> str:
+async def upload_file_to_firebase(file_content: bytes, filename: str, scratch: bool = False) -> str:
     try:
-        blob = firebase_bucket.blob(filename)
-        blob.upload_from_string(file_content, content_type='application/octet-stream')
-        logging.info(f"File uploaded to Firebase: {filename}")
+        await run_storage_io(get_storage(scratch).upload, filename, file_content, content_type='application/octet-stream')
+        logging.info(f"File uploaded to storage: {filename}")
         return filename
     except Exception as e:
-        logging.error(f"Error uploading file to Firebase: {str(e)}")
-        raise
\ No newline at end of file
+        logging.error(f"Error uploading file to storage: {str(e)}")
+        raise
+
+class MediaHandle:
+    """
+    Request-scoped handle to a stored file. The content is fetched from storage
+    on first access and reused by every service that receives the handle.
+    """
+    def __init__(self, filename: str, content: Optional[bytes] = None, scratch: bool = False, digest: Optional[str] = None):
+        self.filename = filename
+        self.scratch = scratch
+        self._content = content
+        self._digest = digest
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = get_file_content(self.filename, self.scratch)
+        return self._content
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the content, computed while downloading when available."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.content).hexdigest()
+        return self._digest
+
+    async def load(self) -> "MediaHandle":
+        """Fetch the content off the event loop so later sync reads are free."""
+        if self._content is None:
+            self._content = await fetch_file_content(self.filename, self.scratch)
+        return self
+
+    def __str__(self) -> str:
+        return self.filename
+
+def read_media(media: Union[str, bytes, MediaHandle]) -> bytes:
+    if isinstance(media, MediaHandle):
+        return media.content
+    if isinstance(media, bytes):
+        return media
+    return get_file_content(media)
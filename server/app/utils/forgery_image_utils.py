@@ -8,7 +8,8 @@ import cv2
 import os
 from fastapi import HTTPException
 import io
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import get_file_content, MediaHandle
+from app.utils.perceptual_hash import strip_metadata
 import logging
 
 SUPPORTED_IMAGE_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp']
@@ -65,23 +66,24 @@ def preprocess_image(image: Union[str, np.ndarray, Image.Image], hash_size: int
     image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
     return image
 
-def strip_metadata(img: Image.Image) -> Image.Image:
-    data = list(img.getdata())
-    img_without_exif = Image.new(img.mode, img.size)
-    img_without_exif.putdata(data)
-    return img_without_exif
-
 def detect_face(image_input) -> bool:
     """
     Enhanced face detection using cascaded classifiers.
     Args:
-        image_input: Either raw image bytes or a filename
+        image_input: Raw image bytes, a MediaHandle, a filename or a decoded
+            RGB uint8 array (such as a sampled video frame)
     Returns:
         bool: True if any faces are detected, False otherwise
     """
     try:
+        if isinstance(image_input, MediaHandle):
+            image_input = image_input.content
+
+        # Decoded frames are already RGB arrays, so no image decode is needed
+        if isinstance(image_input, np.ndarray):
+            img = cv2.cvtColor(image_input, cv2.COLOR_RGB2BGR)
         # Determine if the input is bytes or a filename
-        if isinstance(image_input, bytes):
+        elif isinstance(image_input, bytes):
             # Decode image from bytes
             nparr = np.frombuffer(image_input, np.uint8)
             img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
@@ -1,17 +1,30 @@
 import av
 import numpy as np
-from PIL import Image
 import io
 import traceback
-from app.utils.file_utils import get_file_content, upload_file_to_firebase, remove_temp_file
+from app.utils.file_utils import fetch_file_content, upload_file_to_firebase, MediaHandle
+from app.utils.frame_sampling import sample_frames, stream_duration
+from app.core.config import (
+    FRAME_SAMPLING_MODE, FRAME_SAMPLE_BUDGET, VIDEO_TRANSCODE_POLICY, VIDEO_TRANSCODE_PRESET, VIDEO_TRANSCODE_THREADS,
+    VIDEO_MAX_DURATION, VIDEO_MAX_WIDTH, VIDEO_MAX_HEIGHT, VIDEO_MAX_SIZE_MB
+)
+from app.core.cpu_budget import available_cpus, configure_video_decoder
+from fastapi.concurrency import run_in_threadpool
 import logging
-import uuid
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 import librosa
 
-async def extract_audio(firebase_filename: str) -> str:
+TRANSCODE_POLICIES = ("auto", "always", "never")
+
+def _as_media(video: Union[str, MediaHandle]) -> MediaHandle:
+    # Plain filenames refer to transcoded videos in scratch storage
+    return video if isinstance(video, MediaHandle) else MediaHandle(video, scratch=True)
+
+async def extract_audio(video: Union[str, MediaHandle]) -> Optional[str]:
+    media = _as_media(video)
+    firebase_filename = media.filename
     try:
-        video_content = get_file_content(firebase_filename)
+        video_content = (await media.load()).content
         input_container = av.open(io.BytesIO(video_content))
         
         audio_stream = next((s for s in input_container.streams if s.type == 'audio'), None)
@@ -51,7 +64,7 @@ async def extract_audio(firebase_filename: str) -> str:
             return None
         
         audio_filename = f"{firebase_filename}_audio.wav"
-        await upload_file_to_firebase(audio_content, audio_filename)
+        await upload_file_to_firebase(audio_content, audio_filename, scratch=True)
         
         logging.info(f"Audio extracted and uploaded: {audio_filename}")
         return audio_filename
@@ -85,113 +98,179 @@ def detect_speech(audio_content: bytes) -> bool:
         logging.error(traceback.format_exc())
         return False
 
-async def extract_frames(firebase_filename: str, max_frames: int = 20) -> List[str]:
-    frames = []
-    video_content = get_file_content(firebase_filename)
-    
+def _sample_frame_arrays(video_content: bytes, max_frames: int, mode: str) -> List[np.ndarray]:
+    arrays = []
     try:
         with av.open(io.BytesIO(video_content)) as container:
-            video_stream = container.streams.video[0]
-            duration = float(video_stream.duration * video_stream.time_base)
-            frame_interval = duration / max_frames
-
-            for i in range(max_frames):
-                container.seek(int(i * frame_interval * av.time_base))
-                for frame in container.decode(video=0):
-                    frame_rgb = frame.to_rgb().to_ndarray()
-                    frame_image = Image.fromarray(frame_rgb)
-                    
-                    frame_filename = f"{firebase_filename}_frame_{i}.jpg"
-                    frame_byte_arr = io.BytesIO()
-                    frame_image.save(frame_byte_arr, format='JPEG')
-                    frame_byte_arr = frame_byte_arr.getvalue()
-                    
-                    await upload_file_to_firebase(frame_byte_arr, frame_filename)
-                    frames.append(frame_filename)
-                    break  # Only take the first frame after seeking
-
+            configure_video_decoder(container.streams.video[0])
+            for frame in sample_frames(container, max_frames, mode):
+                arrays.append(frame.to_ndarray(format='rgb24'))
     except Exception as e:
         logging.error(f"Error extracting frames: {str(e)}")
+    return arrays
 
+async def extract_frames(video: Union[str, MediaHandle], max_frames: int = FRAME_SAMPLE_BUDGET,
+                         mode: str = FRAME_SAMPLING_MODE) -> List[np.ndarray]:
+    """
+    Sample frames from a stored video and return them as decoded RGB uint8
+    arrays (height x width x 3). Frames stay in memory; nothing is written
+    back to storage.
+    """
+    media = _as_media(video)
+    video_content = (await media.load()).content
+
+    # Decoding is CPU-bound, so it runs off the event loop
+    frames = await run_in_threadpool(_sample_frame_arrays, video_content, max_frames, mode)
+    logging.info(f"Sampled {len(frames)} frame(s) from {media.filename} ({mode} sampling)")
     return frames
 
-async def compress_and_process_video(firebase_filename: str, target_size_mb: int = 50, max_duration: int = 60) -> str:
-    video_content = get_file_content(firebase_filename)
-    
+def _scaled_dimensions(width: int, height: int) -> Tuple[int, int]:
+    """Dimensions after capping the long side at VIDEO_MAX_WIDTH (landscape) or VIDEO_MAX_HEIGHT (portrait)."""
+    if width > height:
+        new_width = min(width, VIDEO_MAX_WIDTH)
+        return new_width, int((new_width / width) * height)
+    new_height = min(height, VIDEO_MAX_HEIGHT)
+    return int((new_height / height) * width), new_height
+
+def probe_video(video_content: bytes) -> Optional[dict]:
+    """Basic stream information, or None if no video frame can be decoded."""
     try:
-        input_container = av.open(io.BytesIO(video_content))
-        video_stream = input_container.streams.video[0]
-        audio_stream = next((s for s in input_container.streams if s.type == 'audio'), None)
+        with av.open(io.BytesIO(video_content)) as container:
+            stream = container.streams.video[0]
+            frame = next(container.decode(stream), None)
+            if frame is None:
+                return None
+            return {
+                "codec": stream.codec_context.name,
+                "width": frame.width,
+                "height": frame.height,
+                "duration": stream_duration(container, stream),
+            }
+    except Exception as e:
+        logging.warning(f"Could not decode video: {str(e)}")
+        return None
 
-        # Get video information
-        width = video_stream.width
-        height = video_stream.height
-        duration = float(video_stream.duration * video_stream.time_base)
-        duration = min(duration, max_duration)
-        frame_rate = video_stream.average_rate
+def transcode_reasons(info: Optional[dict], size_bytes: int) -> List[str]:
+    """Why a video has to be transcoded before analysis; empty when the original can be used."""
+    if info is None:
+        return ["unreadable"]
+    reasons = []
+    if info["duration"] > VIDEO_MAX_DURATION:
+        reasons.append(f"duration {info['duration']:.1f}s > {VIDEO_MAX_DURATION}s")
+    if _scaled_dimensions(info["width"], info["height"]) != (info["width"], info["height"]):
+        reasons.append(f"resolution {info['width']}x{info['height']} > {VIDEO_MAX_WIDTH}x{VIDEO_MAX_HEIGHT}")
+    if size_bytes > VIDEO_MAX_SIZE_MB * 1024 * 1024:
+        reasons.append(f"size {size_bytes / (1024 * 1024):.1f}MB > {VIDEO_MAX_SIZE_MB}MB")
+    return reasons
 
-        # Calculate target bitrate
-        target_size_bits = target_size_mb * 8 * 1024 * 1024
-        target_bitrate = int(target_size_bits / duration)
+async def prepare_video_for_analysis(media: MediaHandle, policy: str = VIDEO_TRANSCODE_POLICY) -> MediaHandle:
+    """
+    The video to sample frames and audio from: the original upload, or a
+    transcoded copy in scratch storage when the policy requires one. Callers
+    remove the copy (media.scratch is True) once they are done with it.
+    """
+    if policy not in TRANSCODE_POLICIES:
+        raise ValueError(f"Unknown VIDEO_TRANSCODE_POLICY '{policy}'. Expected one of: {', '.join(TRANSCODE_POLICIES)}")
+    video_content = (await media.load()).content
+    if policy == "always":
+        reasons = ["policy"]
+    else:
+        info = await run_in_threadpool(probe_video, video_content)
+        reasons = transcode_reasons(info, len(video_content))
+        if reasons and policy == "never":
+            logging.warning(f"Analyzing {media.filename} without transcoding despite: {', '.join(reasons)}")
+            reasons = []
+    if not reasons:
+        logging.info(f"Analyzing original video {media.filename}")
+        return media
 
-        # Adjust dimensions
-        if width > height:
-            new_width = min(width, 1280)
-            new_height = int((new_width / width) * height)
-        else:
-            new_height = min(height, 720)
-            new_width = int((new_height / height) * width)
+    logging.info(f"Transcoding {media.filename} before analysis ({', '.join(reasons)})")
+    return await compress_and_process_video(media.filename, video_content=video_content)
 
-        new_width = new_width - (new_width % 2)
-        new_height = new_height - (new_height % 2)
+def transcode_video(video_content: bytes, target_size_mb: int = VIDEO_MAX_SIZE_MB,
+                    max_duration: int = VIDEO_MAX_DURATION) -> bytes:
+    """Re-encode a video as H.264 / AAC MP4 within the size and duration limits. CPU-bound."""
+    input_container = av.open(io.BytesIO(video_content))
+    video_stream = configure_video_decoder(input_container.streams.video[0])
+    audio_stream = next((s for s in input_container.streams if s.type == 'audio'), None)
 
-        output_buffer = io.BytesIO()
-        output_container = av.open(output_buffer, mode='w', format='mp4')
-        output_video_stream = output_container.add_stream('libx264', rate=frame_rate)
-        output_video_stream.width = new_width
-        output_video_stream.height = new_height
-        output_video_stream.pix_fmt = 'yuv420p'
-        output_video_stream.bit_rate = target_bitrate
-
-        if audio_stream:
-            output_audio_stream = output_container.add_stream('aac', rate=audio_stream.rate)
-            output_audio_stream.bit_rate = min(128000, audio_stream.bit_rate or 128000)  # 128k bitrate for audio, or lower if original is lower
-
-        for packet in input_container.demux((video_stream, audio_stream) if audio_stream else (video_stream,)):
-            if packet.dts is None:
-                continue
-
-            if packet.stream.type == 'video':
-                for frame in packet.decode():
-                    if frame.time > duration:
-                        break
-                    new_frame = frame.reformat(width=new_width, height=new_height, format='yuv420p')
-                    for packet in output_video_stream.encode(new_frame):
-                        output_container.mux(packet)
-            elif packet.stream.type == 'audio' and audio_stream:
-                for frame in packet.decode():
-                    if frame.time > duration:
-                        break
-                    for packet in output_audio_stream.encode(frame):
-                        output_container.mux(packet)
-
-        # Flush streams
-        for packet in output_video_stream.encode(None):
+    # Get video information
+    width = video_stream.width
+    height = video_stream.height
+    duration = stream_duration(input_container, video_stream)
+    duration = min(duration, max_duration)
+    frame_rate = video_stream.average_rate
+
+    # Calculate target bitrate
+    target_size_bits = target_size_mb * 8 * 1024 * 1024
+    target_bitrate = int(target_size_bits / duration)
+
+    # Adjust dimensions
+    new_width, new_height = _scaled_dimensions(width, height)
+
+    new_width = new_width - (new_width % 2)
+    new_height = new_height - (new_height % 2)
+
+    output_buffer = io.BytesIO()
+    output_container = av.open(output_buffer, mode='w', format='mp4')
+    output_video_stream = output_container.add_stream('libx264', rate=frame_rate)
+    output_video_stream.width = new_width
+    output_video_stream.height = new_height
+    output_video_stream.pix_fmt = 'yuv420p'
+    output_video_stream.bit_rate = target_bitrate
+    output_video_stream.options = {
+        'preset': VIDEO_TRANSCODE_PRESET,
+        'threads': str(VIDEO_TRANSCODE_THREADS or available_cpus()),
+    }
+
+    if audio_stream:
+        output_audio_stream = output_container.add_stream('aac', rate=audio_stream.rate)
+        output_audio_stream.bit_rate = min(128000, audio_stream.bit_rate or 128000)  # 128k bitrate for audio, or lower if original is lower
+
+    for packet in input_container.demux((video_stream, audio_stream) if audio_stream else (video_stream,)):
+        if packet.dts is None:
+            continue
+
+        if packet.stream.type == 'video':
+            for frame in packet.decode():
+                if frame.time > duration:
+                    break
+                new_frame = frame.reformat(width=new_width, height=new_height, format='yuv420p')
+                for packet in output_video_stream.encode(new_frame):
+                    output_container.mux(packet)
+        elif packet.stream.type == 'audio' and audio_stream:
+            for frame in packet.decode():
+                if frame.time > duration:
+                    break
+                for packet in output_audio_stream.encode(frame):
+                    output_container.mux(packet)
+
+    # Flush streams
+    for packet in output_video_stream.encode(None):
+        output_container.mux(packet)
+    if audio_stream:
+        for packet in output_audio_stream.encode(None):
             output_container.mux(packet)
-        if audio_stream:
-            for packet in output_audio_stream.encode(None):
-                output_container.mux(packet)
 
-        # Close the output container
-        output_container.close()
-        
-        # Get the compressed content
-        compressed_content = output_buffer.getvalue()
+    # Close the output container
+    output_container.close()
+    return output_buffer.getvalue()
+
+async def compress_and_process_video(firebase_filename: str, target_size_mb: int = VIDEO_MAX_SIZE_MB,
+                                     max_duration: int = VIDEO_MAX_DURATION,
+                                     video_content: Optional[bytes] = None) -> MediaHandle:
+    if video_content is None:
+        video_content = await fetch_file_content(firebase_filename)
+    
+    try:
+        # The encode runs off the event loop so other requests are served meanwhile
+        compressed_content = await run_in_threadpool(transcode_video, video_content, target_size_mb, max_duration)
         output_filename = f"{firebase_filename}_compressed.mp4"
-        await upload_file_to_firebase(compressed_content, output_filename)
+        await upload_file_to_firebase(compressed_content, output_filename, scratch=True)
 
-        logging.info(f"Compressed video uploaded to Firebase: {output_filename}")
-        return output_filename
+        logging.info(f"Compressed video uploaded to scratch storage: {output_filename}")
+        # The handle keeps the bytes, so readers never fetch the copy back
+        return MediaHandle(output_filename, content=compressed_content, scratch=True)
 
     except Exception as e:
         logging.error(f"Error compressing and processing video: {str(e)}")
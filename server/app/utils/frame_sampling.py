@@ -0,0 +1,201 @@
+import bisect
+import logging
+from typing import List, Optional, Sequence, Tuple
+import av
+import numpy as np
+from app.core.config import SCENE_CHANGE_THRESHOLD, SCENE_SAMPLE_FPS, SCENE_DETECTION_SKIP_FRAME
+
+SAMPLING_MODES = ("uniform", "keyframes", "scene")
+# Scene detection compares gray thumbnails of this size
+SCENE_THUMBNAIL_SIZE = 64
+
+def stream_duration(container, stream) -> float:
+    if stream.duration is not None:
+        return float(stream.duration * stream.time_base)
+    if container.duration is not None:
+        return container.duration / av.time_base
+    return 0.0
+
+def decode_at(container, stream, pts: int) -> Optional[av.VideoFrame]:
+    """First frame at or after pts, decoding forward from the keyframe before it."""
+    container.seek(pts, stream=stream, backward=True)
+    for frame in container.decode(stream):
+        if frame.pts is None or frame.pts >= pts:
+            return frame
+    return None
+
+def spread_evenly(items: Sequence, budget: int) -> list:
+    """Pick at most budget items evenly spaced across the sequence, keeping both ends."""
+    if len(items) <= budget:
+        return list(items)
+    indices = np.unique(np.round(np.linspace(0, len(items) - 1, budget)).astype(int))
+    return [items[i] for i in indices]
+
+def sample_uniform(container, stream, budget: int) -> List[av.VideoFrame]:
+    """The first frame after each of budget evenly spaced seeks."""
+    frames = []
+    frame_interval = stream_duration(container, stream) / budget
+    for i in range(budget):
+        container.seek(int(i * frame_interval * av.time_base))
+        for frame in container.decode(stream):
+            frames.append(frame)
+            break  # Only take the first frame after seeking
+    return frames
+
+def keyframe_timestamps(container, stream) -> List[int]:
+    """Keyframe pts from a demux-only pass; no frames are decoded."""
+    timestamps = [packet.pts for packet in container.demux(stream) if packet.is_keyframe and packet.pts is not None]
+    container.seek(0)
+    return sorted(timestamps)
+
+def decode_times(container, stream, times: Sequence[float], keyframes: Sequence[int]) -> List[av.VideoFrame]:
+    """
+    The first frame at or after each of the sorted times (in seconds). The
+    decoder seeks once per GOP that holds a target and decodes forward
+    through the targets in it, so no GOP is decoded twice.
+    """
+    time_base = float(stream.time_base)
+    frames = []
+    decoder = None
+    current_gop = None
+    for time in times:
+        pts = int(round(time / time_base))
+        gop = bisect.bisect_right(keyframes, pts) - 1
+        if decoder is None or gop != current_gop:
+            container.seek(pts, stream=stream, backward=True)
+            decoder = container.decode(stream)
+            current_gop = gop
+        for frame in decoder:
+            if frame.pts is None or frame.pts >= pts:
+                frames.append(frame)
+                break
+    return frames
+
+def sample_keyframes(container, stream, budget: int) -> List[av.VideoFrame]:
+    """
+    Keyframes spread evenly over the clip. The decoder skips every non-key
+    frame, so each sample costs a single intra-frame decode. Clips with fewer
+    keyframes than the budget (long GOPs) use every keyframe and fill the
+    rest of the budget with frames from the longest gaps between them.
+    """
+    timestamps = keyframe_timestamps(container, stream)
+    chosen = spread_evenly(timestamps, budget)
+    frames = []
+    stream.codec_context.skip_frame = "NONKEY"
+    try:
+        for pts in chosen:
+            frame = decode_at(container, stream, pts)
+            if frame is not None:
+                frames.append(frame)
+    finally:
+        stream.codec_context.skip_frame = "DEFAULT"
+
+    missing = budget - len(frames)
+    if missing > 0 and frames:
+        logging.info(f"Only {len(frames)} keyframe(s) for a budget of {budget}; adding {missing} frame(s) between them")
+        starts = sorted(frame.time for frame in frames if frame.time is not None)
+        ends = starts[1:] + [max(starts[-1], stream_duration(container, stream))]
+        gaps = [(start, end) for start, end in zip(starts, ends) if end > start]
+        seen = {frame.pts for frame in frames}
+        for frame in decode_times(container, stream, allocate_frame_times(gaps, missing), timestamps):
+            # A gap without frames between its keyframes maps onto the next keyframe
+            if frame.pts not in seen:
+                seen.add(frame.pts)
+                frames.append(frame)
+        frames.sort(key=lambda frame: frame.time or 0.0)
+    return frames
+
+def detect_scenes(container, stream, threshold: float = SCENE_CHANGE_THRESHOLD,
+                  sample_fps: float = SCENE_SAMPLE_FPS,
+                  skip_frame: str = SCENE_DETECTION_SKIP_FRAME) -> List[Tuple[float, float]]:
+    """
+    Split the clip into (start, end) scenes in seconds. Frames are compared
+    sample_fps times a second as small gray thumbnails scaled in swscale, and
+    a cut is placed where the mean absolute difference exceeds threshold
+    (on a 0-1 scale). The decoder skips the frames named by skip_frame:
+    "NONREF" drops frames nothing else depends on, "NONKEY" compares
+    keyframes only, which is much cheaper but places cuts at keyframe
+    resolution.
+    """
+    step = 1.0 / sample_fps
+    next_time = None
+    previous = None
+    start = None
+    last_time = None
+    cuts = []
+    stream.codec_context.skip_frame = skip_frame
+    try:
+        for frame in container.decode(stream):
+            if frame.time is None:
+                continue
+            if start is None:
+                start = frame.time
+            last_time = frame.time
+            if next_time is not None and frame.time < next_time:
+                continue
+            next_time = frame.time + step
+            thumbnail = frame.reformat(width=SCENE_THUMBNAIL_SIZE, height=SCENE_THUMBNAIL_SIZE, format='gray').to_ndarray()
+            thumbnail = thumbnail.astype(np.float32) / 255.0
+            if previous is not None and float(np.mean(np.abs(thumbnail - previous))) > threshold:
+                cuts.append(frame.time)
+            previous = thumbnail
+    finally:
+        stream.codec_context.skip_frame = "DEFAULT"
+    container.seek(0)
+
+    if start is None:
+        return []
+    end = max(last_time + step / 2, start + stream_duration(container, stream)) if last_time is not None else start
+    bounds = [start] + cuts + [end]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+def allocate_frame_times(scenes: List[Tuple[float, float]], budget: int) -> List[float]:
+    """
+    Spread a fixed frame budget across scenes. Every scene gets one frame and
+    the rest are shared in proportion to scene length; with more scenes than
+    budget, only the longest scenes are sampled.
+    """
+    if not scenes or budget <= 0:
+        return []
+    lengths = np.array([end - start for start, end in scenes], dtype=np.float64)
+    if len(scenes) >= budget:
+        keep = sorted(np.argsort(-lengths, kind='stable')[:budget])
+        return [float(scenes[i][0] + scenes[i][1]) / 2 for i in keep]
+
+    counts = np.ones(len(scenes), dtype=int)
+    remaining = budget - len(scenes)
+    if lengths.sum() > 0:
+        share = lengths / lengths.sum() * remaining
+        counts += np.floor(share).astype(int)
+        leftover = remaining - int(np.floor(share).sum())
+        for i in np.argsort(-(share - np.floor(share)), kind='stable')[:leftover]:
+            counts[i] += 1
+
+    times = []
+    for (start, end), count in zip(scenes, counts):
+        times.extend(float(start + (k + 0.5) * (end - start) / count) for k in range(count))
+    return times
+
+def sample_scenes(container, stream, budget: int) -> List[av.VideoFrame]:
+    scenes = detect_scenes(container, stream)
+    logging.info(f"Detected {len(scenes)} scene(s)")
+    frames = []
+    seen = set()
+    for time in allocate_frame_times(scenes, budget):
+        frame = decode_at(container, stream, int(round(time / float(stream.time_base))))
+        # Short scenes can map several target times onto the same frame
+        if frame is not None and frame.pts not in seen:
+            seen.add(frame.pts)
+            frames.append(frame)
+    return frames
+
+def sample_frames(container, budget: int, mode: str = "uniform") -> List[av.VideoFrame]:
+    """Sample at most budget frames from the first video stream of an open container."""
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown frame sampling mode '{mode}'. Expected one of: {', '.join(SAMPLING_MODES)}")
+    stream = container.streams.video[0]
+    if mode == "keyframes":
+        return sample_keyframes(container, stream, budget)
+    if mode == "scene":
+        return sample_scenes(container, stream, budget)
+    return sample_uniform(container, stream, budget)
@@ -5,7 +5,8 @@ from PIL import Image
 from io import BytesIO
 import imghdr
 from fastapi import HTTPException
-from app.utils.file_utils import get_file_content
+from app.utils.file_utils import get_file_content, read_media
+from app.utils.perceptual_hash import dct_hash_batch, hamming_distance as packed_hamming_distance, bitstring_to_uint64, to_bitstring, strip_metadata
 
 def preprocess_image(image: Union[str, np.ndarray, Image.Image], hash_size: int = 32) -> np.ndarray:
     if isinstance(image, str):
@@ -25,35 +26,23 @@ def preprocess_image(image: Union[str, np.ndarray, Image.Image], hash_size: int
     
     return image
 
-def strip_metadata(img: Image.Image) -> Image.Image:
-    data = list(img.getdata())
-    img_without_exif = Image.new(img.mode, img.size)
-    img_without_exif.putdata(data)
-    return img_without_exif
-
 def perceptual_image_hash(image: Union[str, np.ndarray, Image.Image], hash_size: int = 32) -> str:
     processed_image = preprocess_image(image, hash_size)
-    dct = cv2.dct(np.float32(processed_image))
-    dct_low = dct[:8, :8]
-    median = np.median(dct_low[1:])
-    
-    hash_value = ''
-    for i in range(8):
-        for j in range(8):
-            hash_value += '1' if dct_low[i, j] > median else '0'
-    
-    return hash_value
+    packed_hash = dct_hash_batch(processed_image[np.newaxis])[0]
+    return to_bitstring(packed_hash)[0]
 
 def hamming_distance(hash1: str, hash2: str) -> int:
+    if len(hash1) == len(hash2) == 64 and not set(hash1 + hash2) - {'0', '1'}:
+        return int(packed_hamming_distance(bitstring_to_uint64(hash1), bitstring_to_uint64(hash2)))
     return sum(c1 != c2 for c1, c2 in zip(hash1, hash2))
 
 def are_images_similar(hash1: str, hash2: str, threshold: int = 5) -> bool:
     distance = hamming_distance(hash1, hash2)
     return distance <= threshold
 
-def process_image(filename: str):
+def process_image(media):
     try:
-        content = get_file_content(filename)
+        content = read_media(media)
         img = Image.open(BytesIO(content))
         image_hash = perceptual_image_hash(img)
         
@@ -61,10 +50,10 @@ def process_image(filename: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
-def compare_images(filename1: str, filename2: str):
+def compare_images(media1, media2):
     try:
-        content1 = get_file_content(filename1)
-        content2 = get_file_content(filename2)
+        content1 = read_media(media1)
+        content2 = read_media(media2)
         img1 = Image.open(BytesIO(content1))
         img2 = Image.open(BytesIO(content2))
         hash1 = perceptual_image_hash(img1)
@@ -0,0 +1,197 @@
+import io
+import logging
+from typing import BinaryIO, Callable, List, Optional, Sequence, Union
+import av
+import numpy as np
+from scipy.fftpack import dct
+from app.utils.perceptual_hash import average_hash_batch, to_hex
+from app.core.cpu_budget import configure_video_decoder
+
+AUDIO_SAMPLE_RATE = 44100
+# Frames are buffered as thumbnails and transformed in batches of this size.
+FEATURE_BATCH_SIZE = 256
+
+class DecodedVideoFrame:
+    """
+    A decoded video frame shared by every extractor. Conversions are computed
+    on first use and cached, so extractors needing the same representation do
+    not repeat the work.
+    """
+    def __init__(self, frame: av.VideoFrame, index: int):
+        self.frame = frame
+        self.index = index
+        self._thumbnails = {}
+
+    def gray_thumbnail(self, size: int, interpolation: str) -> np.ndarray:
+        """
+        size x size grayscale uint8 thumbnail. Scaling and pixel format
+        conversion both run in swscale, so the full-resolution frame is never
+        converted to RGB or copied into numpy.
+        """
+        key = (size, interpolation)
+        if key not in self._thumbnails:
+            self._thumbnails[key] = self.frame.reformat(
+                width=size, height=size, format='gray', interpolation=interpolation
+            ).to_ndarray()
+        return self._thumbnails[key]
+
+class VideoFrameExtractor:
+    def on_video_frame(self, frame: DecodedVideoFrame):
+        raise NotImplementedError
+
+class AudioChunkExtractor:
+    def on_audio_frame(self, frame: av.AudioFrame):
+        raise NotImplementedError
+
+class DCTFeatureExtractor(VideoFrameExtractor):
+    """
+    Low-frequency 8x8 DCT coefficients of a 32x32 grayscale thumbnail per
+    frame. With keep_features=False only their running sum is kept, which is
+    all the video hash needs, so memory does not grow with the video length.
+    """
+    def __init__(self, keep_features: bool = True):
+        self.keep_features = keep_features
+        self.features = []
+        self._sum = np.zeros(64, dtype=np.float64)
+        self._count = 0
+        self._pending = []
+
+    def on_video_frame(self, frame: DecodedVideoFrame):
+        self._pending.append(frame.gray_thumbnail(32, 'BICUBIC').astype(np.float64))
+        if len(self._pending) >= FEATURE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        batch = np.stack(self._pending)
+        self._pending = []
+        dct_batch = dct(dct(batch, axis=2, norm='ortho'), axis=1, norm='ortho')[:, :8, :8].reshape(len(batch), 64)
+        self._sum += dct_batch.sum(axis=0)
+        self._count += len(batch)
+        if self.keep_features:
+            self.features.extend(dct_batch)
+
+    def result(self) -> np.ndarray:
+        self._flush()
+        return np.array(self.features)
+
+    def mean(self) -> Optional[np.ndarray]:
+        """Mean feature vector over every frame, or None if no frame was seen."""
+        self._flush()
+        return self._sum / self._count if self._count else None
+
+class AverageHashExtractor(VideoFrameExtractor):
+    """Per-frame average hash, packed as uint64 and rendered as hex on request."""
+    def __init__(self):
+        self.packed_hashes = []
+        self._pending = []
+
+    def on_video_frame(self, frame: DecodedVideoFrame):
+        # 8x8 LANCZOS reduction, as imagehash.average_hash performs.
+        self._pending.append(frame.gray_thumbnail(8, 'LANCZOS'))
+        if len(self._pending) >= FEATURE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self.packed_hashes.append(average_hash_batch(np.stack(self._pending)))
+        self._pending = []
+
+    def packed(self) -> np.ndarray:
+        self._flush()
+        if not self.packed_hashes:
+            return np.zeros(0, dtype=np.uint64)
+        return np.concatenate(self.packed_hashes)
+
+    def result(self) -> List[str]:
+        return to_hex(self.packed())
+
+class PCMExtractor(AudioChunkExtractor):
+    """
+    Resamples every audio chunk to mono float32 PCM at AUDIO_SAMPLE_RATE. The
+    chunks are collected for result(), or passed to on_chunk as they are
+    produced when it is given.
+    """
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE, on_chunk: Optional[Callable[[np.ndarray], None]] = None):
+        self.sample_rate = sample_rate
+        self.resampler = av.AudioResampler(format='flt', layout='mono', rate=sample_rate)
+        self.on_chunk = on_chunk
+        self.chunks = []
+
+    def _collect(self, frames):
+        if frames is None:
+            return
+        if not isinstance(frames, list):
+            frames = [frames]
+        for resampled in frames:
+            chunk = resampled.to_ndarray().reshape(-1).astype(np.float32, copy=False)
+            if self.on_chunk is not None:
+                self.on_chunk(chunk)
+            else:
+                self.chunks.append(chunk)
+
+    def on_audio_frame(self, frame: av.AudioFrame):
+        # Timestamps from the source stream are irrelevant for the fingerprint and
+        # can confuse the resampler when they jump, so let it count samples itself.
+        frame.pts = None
+        self._collect(self.resampler.resample(frame))
+
+    def finish(self):
+        self._collect(self.resampler.resample(None))
+
+    def result(self) -> np.ndarray:
+        if not self.chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self.chunks)
+
+class MediaProbe:
+    def __init__(self, has_video: bool, has_audio: bool, video_frames: int = 0, audio_frames: int = 0):
+        self.has_video = has_video
+        self.has_audio = has_audio
+        self.video_frames = video_frames
+        self.audio_frames = audio_frames
+
+def decode_media(video_content: Union[bytes, str, BinaryIO],
+                 video_extractors: Sequence[VideoFrameExtractor] = (),
+                 audio_extractors: Sequence[AudioChunkExtractor] = ()) -> MediaProbe:
+    """
+    Demux and decode the container once, fanning each decoded video frame and
+    audio chunk out to the registered extractors. Streams without extractors
+    are not decoded at all. video_content is the file's bytes, a path, or a
+    seekable binary file object such as a spooled or still-downloading file.
+    """
+    source = io.BytesIO(video_content) if isinstance(video_content, (bytes, bytearray)) else video_content
+    with av.open(source) as container:
+        video_stream = next((s for s in container.streams if s.type == 'video'), None)
+        audio_stream = next((s for s in container.streams if s.type == 'audio'), None)
+        probe = MediaProbe(has_video=video_stream is not None, has_audio=audio_stream is not None)
+
+        streams = []
+        if video_stream is not None and video_extractors:
+            streams.append(configure_video_decoder(video_stream))
+        if audio_stream is not None and audio_extractors:
+            streams.append(audio_stream)
+        if not streams:
+            return probe
+
+        for packet in container.demux(streams):
+            for frame in packet.decode():
+                if packet.stream.type == 'video':
+                    decoded = DecodedVideoFrame(frame, probe.video_frames)
+                    for extractor in video_extractors:
+                        extractor.on_video_frame(decoded)
+                    probe.video_frames += 1
+                else:
+                    for extractor in audio_extractors:
+                        extractor.on_audio_frame(frame)
+                    probe.audio_frames += 1
+
+    for extractor in audio_extractors:
+        finish = getattr(extractor, 'finish', None)
+        if finish is not None:
+            finish()
+
+    logging.info(f"Decoded {probe.video_frames} video frames and {probe.audio_frames} audio frames in one pass")
+    return probe
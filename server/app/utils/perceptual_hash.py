@@ -0,0 +1,99 @@
+# Perceptual hashes are packed into uint64 values (one per image or frame);
+# hex and bit-string forms are only produced at the API boundary.
+from functools import lru_cache
+from typing import Iterable, List
+import numpy as np
+from PIL import Image
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def pack_bits(bits: np.ndarray) -> np.ndarray:
+    """Pack (..., 64) boolean arrays into uint64, first bit most significant."""
+    bits = np.asarray(bits, dtype=bool)
+    packed = np.packbits(bits.reshape(bits.shape[:-1] + (64,)), axis=-1)
+    return packed.view('>u8').reshape(bits.shape[:-1]).astype(np.uint64)
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    counts = _POPCOUNT_TABLE[values.view(np.uint8)].reshape(values.shape + (8,))
+    return counts.sum(axis=-1, dtype=np.int64)
+
+def hamming_distance(a, b) -> np.ndarray:
+    """Element-wise Hamming distance between packed hashes (broadcasts)."""
+    return popcount(np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64)))
+
+def to_hex(hashes: Iterable) -> List[str]:
+    return [f"{int(h):016x}" for h in np.atleast_1d(hashes)]
+
+def to_bitstring(hashes: Iterable) -> List[str]:
+    return [f"{int(h):064b}" for h in np.atleast_1d(hashes)]
+
+def hex_to_uint64(hash_value: str) -> np.uint64:
+    return np.uint64(int(hash_value, 16))
+
+def bitstring_to_uint64(hash_value: str) -> np.uint64:
+    return np.uint64(int(hash_value, 2))
+
+@lru_cache(maxsize=None)
+def _dct_matrix(size: int, keep: int = 8) -> np.ndarray:
+    """First `keep` rows of the orthonormal DCT-II matrix (same scaling as cv2.dct)."""
+    n = np.arange(size)
+    k = np.arange(keep)[:, None]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+def dct_low_frequencies(images: np.ndarray, keep: int = 8) -> np.ndarray:
+    """Top-left keep x keep block of the 2D orthonormal DCT for a (N, H, W) batch."""
+    images = np.asarray(images, dtype=np.float64)
+    rows = _dct_matrix(images.shape[-2], keep)
+    cols = _dct_matrix(images.shape[-1], keep)
+    return rows @ images @ cols.T
+
+def dct_hash_batch(images: np.ndarray) -> np.ndarray:
+    """
+    DCT hash for a (N, 32, 32) batch of normalized grayscale thumbnails: each
+    bit of the 8x8 low-frequency block is set when it exceeds the median of
+    rows 1-7 of that block.
+    """
+    low = dct_low_frequencies(images)
+    median = np.median(low[:, 1:, :].reshape(len(low), -1), axis=1)
+    return pack_bits((low > median[:, None, None]).reshape(len(low), 64))
+
+def average_hash_batch(thumbnails: np.ndarray) -> np.ndarray:
+    """Average hash for a (N, 8, 8) batch: bit set where the pixel exceeds the mean."""
+    thumbnails = np.asarray(thumbnails, dtype=np.float64)
+    flat = thumbnails.reshape(len(thumbnails), 64)
+    return pack_bits(flat > flat.mean(axis=1, keepdims=True))
+
+@lru_cache(maxsize=None)
+def _lanczos_column_weights(length: int, size: int = 8) -> np.ndarray:
+    """
+    Linear map PIL applies when resizing a (length x 1) float image to
+    (size x size) with LANCZOS. Every output column is identical, so only the
+    (size, length) vertical weights are kept.
+    """
+    weights = np.zeros((size, length), dtype=np.float64)
+    for k in range(length):
+        basis = np.zeros((length, 1), dtype=np.float32)
+        basis[k, 0] = 1.0
+        resized = np.asarray(Image.fromarray(basis).resize((size, size), Image.LANCZOS), dtype=np.float64)
+        weights[:, k] = resized[:, 0]
+    return weights
+
+def average_hash_columns(columns: np.ndarray) -> np.ndarray:
+    """
+    Average hash of each row of a (N, L) array treated as an L x 1 image,
+    equivalent to imagehash.average_hash(Image.fromarray(row.reshape(L, 1))).
+    The float -> 'L' conversion and the 8-bit rounding of the resize are
+    reproduced so the bits match imagehash exactly.
+    """
+    pixels = np.floor(np.clip(np.asarray(columns, dtype=np.float64), 0, 255))
+    resized = np.floor(pixels @ _lanczos_column_weights(pixels.shape[1]).T + 0.5)
+    resized = np.clip(resized, 0, 255)
+    thumbnails = np.repeat(resized[:, :, None], 8, axis=2)
+    return average_hash_batch(thumbnails)
+
+def strip_metadata(img: Image.Image) -> Image.Image:
+    """Copy the pixel buffer into a fresh image, dropping EXIF and other info."""
+    return Image.frombytes(img.mode, img.size, img.tobytes())
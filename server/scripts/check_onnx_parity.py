@@ -0,0 +1,55 @@
+"""
+Check ONNX Runtime outputs against the native outputs recorded by
+export_onnx.py.
+
+    python scripts/check_onnx_parity.py [--models gan_model ...] [--atol 1e-4]
+
+Exits with status 1 if any exported model drifts beyond the tolerance or
+changes a predicted class.
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.model_backend import MODEL_FILES, OnnxRunner, onnx_model_path, parity_data_path
+
+def check_parity(name, atol=1e-4, rtol=1e-3):
+    """Return (passed, max_abs_diff), or None when the model has no export."""
+    if not os.path.exists(onnx_model_path(name)) or not os.path.exists(parity_data_path(name)):
+        return None
+    recorded = np.load(parity_data_path(name))
+    inputs, expected = recorded["inputs"], recorded["outputs"]
+    actual = OnnxRunner(onnx_model_path(name)).predict(inputs)
+
+    if actual.shape != expected.shape:
+        print(f"{name}: output shape {actual.shape} does not match the recorded {expected.shape}")
+        return False, float("inf")
+    max_abs_diff = float(np.max(np.abs(actual - expected)))
+    passed = np.allclose(actual, expected, atol=atol, rtol=rtol)
+    if expected.ndim == 2 and expected.shape[1] > 1:
+        passed = passed and bool(np.all(actual.argmax(axis=1) == expected.argmax(axis=1)))
+    return passed, max_abs_diff
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--rtol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.models:
+        result = check_parity(name, args.atol, args.rtol)
+        if result is None:
+            print(f"{name:40s} SKIP (not exported)")
+            continue
+        passed, max_abs_diff = result
+        failed = failed or not passed
+        print(f"{name:40s} {'OK  ' if passed else 'FAIL'} max |diff| = {max_abs_diff:.2e}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compare reduced-precision models against FP32 on a local sample set.
+
+    python scripts/evaluate_quantization.py --samples path/to/images [--precisions int8 float16]
+
+For each quantizable model this reports median batch latency, throughput,
+resident memory added by loading the model, serialized model size and
+prediction agreement with the FP32 model on the sample images (any format
+PIL can read; video frames can be dumped to JPEG first).
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Services are built with native FP32 models; quantized variants are derived here
+os.environ["INFERENCE_BACKEND"] = "native"
+os.environ["INFERENCE_PRECISION"] = "fp32"
+os.environ["INFERENCE_WORKERS"] = "0"
+
+from app.core.config import BASE_DIR
+from app.core.model_backend import (
+    QUANTIZABLE_MODELS, PRECISIONS, TorchRunner, model_file_path, quantize_runner, quantized_model_path
+)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff')
+
+def rss_bytes():
+    """Resident set size of this process (Linux), or None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def load_samples(directory, limit):
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    if not paths:
+        sys.exit(f"No sample images found in {directory}")
+    contents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    return contents
+
+def gan_inputs(contents):
+    from app.services.gan_detection_service import GANDetectionService
+    service = GANDetectionService()
+    return service.model, service.preprocess_batch(contents)
+
+def image_manipulation_inputs(contents):
+    from app.services.image_manipulation_service import ImageManipulationService
+    service = ImageManipulationService()
+    return service.model, service.prepare_batch(contents)
+
+def deepfake_video_inputs(contents):
+    import cv2
+    from app.services.deepfake_video_detection import DeepfakeVideoDetectionService
+    service = DeepfakeVideoDetectionService()
+    frames = [cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR) for content in contents]
+    return service.model, service.process_frames(frames)
+
+def face_manipulation_inputs(contents):
+    from PIL import Image
+    from app.services.face_manipulation_service import FaceManipulationService
+    service = FaceManipulationService()
+    images = [Image.open(io.BytesIO(content)).convert('RGB') for content in contents]
+    return service.model, service.processor(images=images, return_tensors="np")["pixel_values"]
+
+INPUT_BUILDERS = {
+    "gan_model": gan_inputs,
+    "image_manipulation_detection_model": image_manipulation_inputs,
+    "deepfake_videos": deepfake_video_inputs,
+    "deepfake_model": face_manipulation_inputs,
+}
+
+def predicted_labels(outputs):
+    # Single-output models are sigmoid scores; the rest are class scores
+    if outputs.shape[1] == 1:
+        return outputs[:, 0] > 0.5
+    return outputs.argmax(axis=1)
+
+def measure(runner, inputs, batch_size, repeats):
+    batches = [inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size)]
+    outputs = np.concatenate([runner.predict(batch) for batch in batches])  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for batch in batches:
+            runner.predict(batch)
+        timings.append(time.perf_counter() - started)
+    return outputs, float(np.median(timings))
+
+def model_size(name, precision, runner):
+    if precision == "fp32":
+        return os.path.getsize(model_file_path(name)) if os.path.exists(model_file_path(name)) else None
+    if isinstance(runner, TorchRunner):
+        import torch
+        buffer = io.BytesIO()
+        torch.save(runner.model.state_dict(), buffer)
+        return buffer.tell()
+    path = quantized_model_path(name, precision)
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", required=True, help="directory of sample images")
+    parser.add_argument("--limit", type=int, default=64, help="maximum number of samples")
+    parser.add_argument("--models", nargs="+", default=sorted(QUANTIZABLE_MODELS), choices=sorted(QUANTIZABLE_MODELS))
+    parser.add_argument("--precisions", nargs="+", default=["int8", "float16"], choices=[p for p in PRECISIONS if p != "fp32"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = load_samples(os.path.abspath(args.samples), args.limit)
+    os.chdir(BASE_DIR)
+
+    print(f"{len(samples)} samples, batch size {args.batch_size}, {args.repeats} timed runs")
+    print(f"{'model':36s} {'precision':9s} {'batch ms':>9s} {'img/s':>8s} {'speedup':>8s} "
+          f"{'rss MB':>8s} {'size MB':>8s} {'agree':>7s} {'max|diff|':>10s}")
+    for name in args.models:
+        rss_before = rss_bytes()
+        fp32_runner, inputs = INPUT_BUILDERS[name](samples)
+        rss_after = rss_bytes()
+        fp32_outputs, fp32_seconds = measure(fp32_runner, inputs, args.batch_size, args.repeats)
+        fp32_labels = predicted_labels(fp32_outputs)
+        batches = -(-len(inputs) // args.batch_size)
+
+        rows = [("fp32", fp32_runner, fp32_outputs, fp32_seconds,
+                 None if rss_before is None else rss_after - rss_before)]
+        for precision in args.precisions:
+            rss_before = rss_bytes()
+            runner = quantize_runner(name, fp32_runner, precision)
+            rss_after = rss_bytes()
+            outputs, seconds = measure(runner, inputs, args.batch_size, args.repeats)
+            rows.append((precision, runner, outputs, seconds,
+                         None if rss_before is None else rss_after - rss_before))
+
+        for precision, runner, outputs, seconds, rss_delta in rows:
+            size = model_size(name, precision, runner)
+            agreement = float(np.mean(predicted_labels(outputs) == fp32_labels))
+            max_diff = float(np.max(np.abs(outputs - fp32_outputs)))
+            print(f"{name:36s} {precision:9s} {1000 * seconds / batches:9.1f} {len(inputs) / seconds:8.1f} "
+                  f"{fp32_seconds / seconds:7.2f}x "
+                  f"{'n/a' if rss_delta is None else f'{rss_delta / 2**20:.1f}':>8s} "
+                  f"{'n/a' if size is None else f'{size / 2**20:.1f}':>8s} "
+                  f"{100 * agreement:6.1f}% {max_diff:10.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+One-time export of the bundled models to ONNX for INFERENCE_BACKEND=onnx.
+
+    pip install tf2onnx onnx
+    python scripts/export_onnx.py [--models gan_model ...] [--opset 17]
+
+Each model is written to ONNX_MODEL_DIR/<name>.onnx with a dynamic batch
+dimension. A few seeded random inputs and the native model's outputs on them
+are saved next to it as <name>.parity.npz, and the export is checked against
+them with check_onnx_parity.py.
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import BASE_DIR, ONNX_MODEL_DIR
+from app.core.model_backend import MODEL_FILES, model_file_path, onnx_model_path, parity_data_path
+from check_onnx_parity import check_parity
+
+def export_keras(name, opset, rng, samples):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(model_file_path(name))
+    input_shape = [None] + list(model.inputs[0].shape[1:])
+    signature = [tf.TensorSpec(input_shape, tf.float32, name="input")]
+
+    # Trace through a tf.function so Keras 2 and Keras 3 models export the same way
+    @tf.function(input_signature=signature)
+    def serve(x):
+        return model(x, training=False)
+
+    tf2onnx.convert.from_function(serve, input_signature=signature, opset=opset, output_path=onnx_model_path(name))
+
+    inputs = rng.random([samples] + input_shape[1:], dtype=np.float32)
+    return inputs, model.predict(inputs, verbose=0)
+
+def export_vit(name, opset, rng, samples):
+    import json
+    import torch
+    from pathlib import Path
+    from app.core.model_backend import TorchRunner
+    from app.services.face_manipulation_service import load_face_manipulation_model
+
+    device = torch.device("cpu")
+    model = load_face_manipulation_model(device)
+    size = json.loads(Path("models/deepfake_image_params.json").read_text())["size"]
+    height, width = (size["height"], size["width"]) if isinstance(size, dict) else (size, size)
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).logits
+
+    dummy = torch.zeros(1, 3, height, width)
+    torch.onnx.export(
+        LogitsOnly(model).eval(), dummy, onnx_model_path(name),
+        input_names=["pixel_values"], output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset
+    )
+
+    # Normalized pixel values are roughly in [-1, 1]
+    inputs = rng.uniform(-1, 1, (samples, 3, height, width)).astype(np.float32)
+    return inputs, TorchRunner(model, device).predict(inputs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--samples", type=int, default=4, help="recorded inputs per model for the parity check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Service loaders use paths relative to the server directory
+    os.chdir(BASE_DIR)
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+
+    failed = False
+    for name in args.models:
+        rng = np.random.default_rng(args.seed)
+        print(f"Exporting {name} -> {onnx_model_path(name)}")
+        if MODEL_FILES[name].endswith(".h5"):
+            inputs, outputs = export_keras(name, args.opset, rng, args.samples)
+        else:
+            inputs, outputs = export_vit(name, args.opset, rng, args.samples)
+        np.savez(parity_data_path(name), inputs=inputs, outputs=outputs)
+
+        passed, max_abs_diff = check_parity(name)
+        failed = failed or not passed
+        print(f"  parity {'OK' if passed else 'FAILED'} (max |diff| = {max_abs_diff:.2e})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()